@@ -0,0 +1,150 @@
+"""
+Measures throughput and latency of the auth endpoints through ``main.app``.
+
+Runs signup, login, refresh and an authenticated request (``get_current_user``) against a SQLite database set up
+the same way as in tests/conftest.py, for every combination of concurrency level and bcrypt cost.
+
+Usage::
+
+    python benchmarks/auth_throughput.py --concurrency 1 8 32 --rounds 4 10 12 --requests 200
+
+Settings are read from .env like the application. ``--no-user-cache`` measures ``get_current_user`` with the
+database lookup on every request.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from itertools import count
+
+import httpx
+from passlib.context import CryptContext
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+sys.path.append(os.path.abspath('.'))
+
+import routes.auth
+from db.connect_db import get_async_db
+from db.models import Base, User
+from main import app
+from services.auth import auth_service
+from services.user_cache import user_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./bench_auth.db"
+PASSWORD = "123456789"
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./bench_auth.db", poolclass=NullPool)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def override_get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def no_email(*args, **kwargs):
+    pass
+
+
+def create_users(number: int, password_hash: str) -> list[str]:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    emails = [f"bench{i}@example.com" for i in range(number)]
+    with SessionLocal() as db:
+        db.add_all(User(username=f"bench{i}", email=email, password=password_hash, confirmed=True,
+                        avatar="https://example.com/avatar.png") for i, email in enumerate(emails))
+        db.commit()
+    return emails
+
+
+async def run_scenario(client: httpx.AsyncClient, make_request, concurrency: int, requests: int) -> dict:
+    latencies, errors, issued = [], 0, count()
+    states = [{} for _ in range(concurrency)]
+    if hasattr(make_request, "setup"):
+        for worker_id, state in enumerate(states):
+            await make_request.setup(client, worker_id, state)
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        state = states[worker_id]
+        while next(issued) < requests:
+            start = time.perf_counter()
+            response = await make_request(client, worker_id, state)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "errors": errors,
+    }
+
+
+def scenarios(emails: list[str], use_user_cache: bool):
+    signups = count()
+
+    async def signup(client, worker_id, state):
+        n = next(signups)
+        return await client.post("/api/auth/signup", json={"username": f"new{n:011d}", "email": f"new{n}@example.com",
+                                                            "password": PASSWORD})
+
+    async def login(client, worker_id, state):
+        return await client.post("/api/auth/login", data={"username": emails[worker_id], "password": PASSWORD})
+
+    async def with_tokens(client, worker_id, state):
+        state.update((await login(client, worker_id, state)).json())
+
+    async def refresh(client, worker_id, state):
+        response = await client.get("/api/auth/refresh_token",
+                                    headers={"Authorization": f"Bearer {state['refresh_token']}"})
+        state["refresh_token"] = response.json().get("refresh_token", state["refresh_token"])
+        return response
+
+    async def current_user(client, worker_id, state):
+        if not use_user_cache:
+            user_cache.clear()
+        return await client.get("/api/users/me/", headers={"Authorization": f"Bearer {state['access_token']}"})
+
+    refresh.setup = with_tokens
+    current_user.setup = with_tokens
+    return {"signup": signup, "login": login, "refresh": refresh, "get_current_user": current_user}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[4, 10, 12], help="bcrypt cost factors")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario run")
+    parser.add_argument("--no-user-cache", action="store_true")
+    args = parser.parse_args()
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    routes.auth.send_email = no_email
+
+    print(f"{'scenario':<18}{'rounds':>7}{'conc':>6}{'rps':>10}{'p50, ms':>10}{'p99, ms':>10}{'errors':>8}")
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        for rounds in args.rounds:
+            auth_service.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+            emails = create_users(max(args.concurrency), auth_service.pwd_context.hash(PASSWORD))
+            for name, make_request in scenarios(emails, not args.no_user_cache).items():
+                for concurrency in args.concurrency:
+                    result = await run_scenario(client, make_request, concurrency, args.requests)
+                    print(f"{name:<18}{rounds:>7}{concurrency:>6}{result['rps']:>10.1f}{result['p50']:>10.2f}"
+                          f"{result['p99']:>10.2f}{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
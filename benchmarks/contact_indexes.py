@@ -0,0 +1,97 @@
+"""
+Measures per-user contact lookups before and after the composite ``contacts`` indexes.
+
+Usage::
+
+    python benchmarks/contact_indexes.py --rows 1000000 --url sqlite:///./bench_contacts.db
+
+The target database is wiped and seeded, so never point ``--url`` at real data.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import create_engine, insert, select, and_
+
+sys.path.append(os.path.abspath('.'))
+
+from db.models import Base, Contact, User
+
+
+def seed(engine, rows: int, users: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'id': i, 'email': f'user{i}@example.com', 'password': 'x'} for i in range(1, users + 1)])
+        batch = []
+        for i in range(1, rows + 1):
+            batch.append({
+                'id': i,
+                'name': f'Name{i % 5000}',
+                'lastname': f'Lastname{i % 7919}',
+                'email': f'contact{i}@example.com',
+                'phone_number': '+380666666666',
+                'birthday': date(1970 + i % 50, i % 12 + 1, i % 28 + 1),
+                'user_id': i % users + 1,
+            })
+            if len(batch) == 50_000:
+                conn.execute(insert(Contact), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Contact), batch)
+
+
+def queries(users: int, rows: int):
+    user_id = random.randint(1, users)
+    i = random.randint(1, rows)
+    return {
+        'user_id + name': select(Contact).filter(and_(Contact.user_id == user_id, Contact.name == f'Name{i % 5000}')),
+        'user_id + lastname': select(Contact).filter(and_(Contact.user_id == user_id, Contact.lastname == f'Lastname{i % 7919}')),
+        'user_id + email': select(Contact).filter(and_(Contact.user_id == user_id, Contact.email == f'contact{i}@example.com')),
+        'user_id + id': select(Contact).filter(and_(Contact.user_id == user_id, Contact.id == i)),
+        'user_id page': select(Contact).filter(Contact.user_id == user_id).order_by(Contact.id).limit(100),
+    }
+
+
+def measure(engine, users: int, rows: int, repeat: int) -> dict:
+    timings = {}
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            for name, query in queries(users, rows).items():
+                start = time.perf_counter()
+                conn.execute(query).all()
+                timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='sqlite:///./bench_contacts.db')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    print(f'Seeding {args.rows} contacts for {args.users} users...')
+    seed(engine, args.rows, args.users)
+
+    indexes = [index for index in Contact.__table__.indexes if index.name.startswith('ix_contacts_user_id_')]
+    for index in indexes:
+        index.drop(bind=engine)
+    before = measure(engine, args.users, args.rows, args.repeat)
+    for index in indexes:
+        index.create(bind=engine)
+    after = measure(engine, args.users, args.rows, args.repeat)
+
+    print(f'{"query":<20}{"before, ms":>12}{"after, ms":>12}{"speedup":>10}')
+    for name in before:
+        print(f'{name:<20}{before[name]:>12.3f}{after[name]:>12.3f}{before[name] / after[name]:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
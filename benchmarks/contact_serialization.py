@@ -0,0 +1,80 @@
+"""
+Compares the default FastAPI response path for contact lists with the direct JSON path, plus compression cost.
+
+Usage::
+
+    python benchmarks/contact_serialization.py --sizes 1000 10000 100000 --repeat 5
+
+The default path is what a route with ``response_model=List[ContactResponse]`` does: validate every ORM row into
+``ContactResponse`` (re-parsing ``PhoneNumber`` and ``EmailStr``), ``jsonable_encoder`` and ``json.dumps``.
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import statistics
+import sys
+import time
+from datetime import date
+from typing import List
+
+import brotli
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+sys.path.append(os.path.abspath('.'))
+
+from db.models import Contact
+from schemas import ContactResponse
+from services.projection import serialize
+
+RESPONSE_FIELD = create_response_field(name='Response_get_contacts', type_=List[ContactResponse])
+
+
+def make_contacts(size: int) -> List[Contact]:
+    return [Contact(id=i, name=f'Name{i}', lastname=f'Lastname{i % 7919}', email=f'contact{i}@example.com',
+                    phone_number='tel:+380-66-666-6666', birthday=date(1970 + i % 50, i % 12 + 1, i % 28 + 1), user_id=1)
+            for i in range(1, size + 1)]
+
+
+async def default_path(contacts: List[Contact]) -> bytes:
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=contacts)
+    return JSONResponse(content).body
+
+
+async def fast_path(contacts: List[Contact]) -> bytes:
+    return serialize(contacts)
+
+
+def timed(func, repeat: int) -> tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"contacts":>9} {"default ms":>11} {"fast ms":>9} {"speedup":>8} {"json KiB":>9} '
+          f'{"gzip ms":>8} {"gzip KiB":>9} {"br ms":>7} {"br KiB":>7}')
+    for size in args.sizes:
+        contacts = make_contacts(size)
+        default_time, default_body = timed(lambda: asyncio.run(default_path(contacts)), args.repeat)
+        fast_time, fast_body = timed(lambda: asyncio.run(fast_path(contacts)), args.repeat)
+        assert len(default_body) == len(fast_body), 'paths produced different output'
+        gzip_time, gzip_body = timed(lambda: gzip.compress(fast_body, 6), args.repeat)
+        br_time, br_body = timed(lambda: brotli.compress(fast_body, quality=4), args.repeat)
+        print(f'{size:>9} {default_time * 1000:>11.1f} {fast_time * 1000:>9.1f} {default_time / fast_time:>7.1f}x '
+              f'{len(fast_body) / 1024:>9.0f} {gzip_time * 1000:>8.1f} {len(gzip_body) / 1024:>9.0f} '
+              f'{br_time * 1000:>7.1f} {len(br_body) / 1024:>7.0f}')
+
+
+if __name__ == '__main__':
+    main()
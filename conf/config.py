@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -5,22 +7,66 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
 
     sqlalchemy_database_url: str
+    sqlalchemy_async_database_url: str | None = None
+    sqlalchemy_replica_urls: List[str] = []
+    replica_max_lag: float = 5
+    replica_lag_check_interval: float = 10
+    replica_sticky_seconds: float = 5
     postgres_db: str
     postgres_user: str
     postgres_password: int
     postgres_port: int
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    db_statement_timeout: int = 0
+    query_debug: bool = False
+    query_repeat_threshold: int = 5
     secret_key: str
     algorithm: str
+    jwt_private_key: str | None = None
+    jwt_public_keys: Dict[str, str] = {}
+    jwt_key_id: str | None = None
+    jwt_decode_cache_size: int = 1024
+    refresh_token_ttl: int = 7 * 24 * 3600
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_queue_limit: int = 32
     mail_username: str
     mail_password: str
     mail_from: str
     mail_port: int
     mail_server: str
+    email_batch_size: int = 50
+    email_poll_interval: float = 5
+    email_smtp_pool_size: int = 4
+    email_max_attempts: int = 5
+    email_retry_backoff: float = 30
+    email_retry_max_backoff: float = 3600
+    contacts_import_batch_size: int = 1000
+    contacts_export_batch_size: int = 1000
     redis_host: str = 'localhost'
     redis_port: int = 6379
+    rate_limit_sync_interval: float = 0.5
+    rate_limit_sync_batch: int = 100
+    user_cache_local_ttl: float = 30
+    user_cache_maxsize: int = 10000
+    user_cache_redis_ttl: int = 300
+    contacts_cache_ttl: int = 300
+    contacts_cache_maxsize: int = 10000
+    compression_minimum_size: int = 1024
     cloudinary_name: str
     cloudinary_api_key: str
     cloudinary_api_secret: str
+    avatar_max_size: int = 2 * 1024 * 1024
+    avatar_content_types: List[str] = ['image/jpeg', 'image/png', 'image/gif', 'image/webp']
+    avatar_upload_timeout: float = 15
+    avatar_upload_workers: int = 4
+    avatar_size: int = 250
+    avatar_webp_quality: int = 80
+    avatar_max_pixels: int = 40_000_000
 
 
 settings = Settings()
@@ -1,13 +1,119 @@
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 
 from conf.config import settings
+from db.pool import PoolStats, instrumented_pool_class
+from db.query_stats import instrument_engine
+from db.routing import ReplicaRouter, READ_METHODS
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def get_async_url(url: str) -> str:
+    """
+    Converts a database URL to the URL of its async driver.
+
+    :param url: Database URL, e.g. ``postgresql+psycopg2://...``.
+    :type url: str
+    :return: URL with the async driver (asyncpg for Postgres, aiosqlite for SQLite).
+    :rtype: str
+    """
+    url = make_url(url)
+    drivername = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def get_engine_options(url: str, stats: PoolStats) -> dict:
+    """
+    Builds engine keyword arguments for pool tuning and statement timeout from settings.
+
+    :param url: Database URL the engine is created for.
+    :type url: str
+    :param stats: Statistics collector for the engine pool.
+    :type stats: PoolStats
+    :return: Keyword arguments for ``create_engine`` / ``create_async_engine``.
+    :rtype: dict
+    """
+    url = make_url(url)
+    if url.get_backend_name() != 'postgresql':
+        return {}
+
+    is_async = url.get_dialect().is_async
+    options = {
+        'poolclass': instrumented_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, stats),
+        'pool_size': settings.db_pool_size,
+        'max_overflow': settings.db_max_overflow,
+        'pool_timeout': settings.db_pool_timeout,
+        'pool_recycle': settings.db_pool_recycle,
+        'pool_pre_ping': settings.db_pool_pre_ping,
+    }
+    if settings.db_statement_timeout:
+        if is_async:
+            options['connect_args'] = {'server_settings': {'statement_timeout': str(settings.db_statement_timeout)}}
+        else:
+            options['connect_args'] = {'options': f'-c statement_timeout={settings.db_statement_timeout}'}
+    return options
+
+
+pool_stats = PoolStats('primary')
+async_pool_stats = PoolStats('primary_async')
 
 SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **get_engine_options(SQLALCHEMY_DATABASE_URL, pool_stats))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_async_database_url or get_async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL,
+                                   **get_engine_options(ASYNC_SQLALCHEMY_DATABASE_URL, async_pool_stats))
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+replica_pool_stats = [PoolStats(f'replica_{i}') for i in range(len(settings.sqlalchemy_replica_urls))]
+replica_engines = [create_async_engine(get_async_url(url), **get_engine_options(get_async_url(url), stats))
+                   for url, stats in zip(settings.sqlalchemy_replica_urls, replica_pool_stats)]
+replica_router = ReplicaRouter(
+    replica_engines,
+    max_lag=settings.replica_max_lag,
+    check_interval=settings.replica_lag_check_interval,
+    sticky_seconds=settings.replica_sticky_seconds,
+)
+
+for instrumented in (engine, async_engine, *replica_engines):
+    instrument_engine(instrumented)
+
+
+def get_pool_stats() -> list[dict]:
+    """
+    Gets statistics of the database connection pools.
+
+    :return: Snapshot of every pool.
+    :rtype: list[dict]
+    """
+    return [pool_stats.snapshot(), async_pool_stats.snapshot()] + [stats.snapshot() for stats in replica_pool_stats]
+
+
+def is_replica_session(db: AsyncSession) -> bool:
+    """
+    Checks whether a session reads from a replica, whose rows may lag behind the primary.
+
+    Rows read from a replica must not be put into shared caches: a write from another device may already have
+    bumped the cache version, and the stale rows would be stored under it.
+
+    :param db: Session from :func:`get_async_db`.
+    :type db: AsyncSession
+    :return: True for replica sessions.
+    :rtype: bool
+    """
+    return db.info.get('replica', False)
+
 
 # Dependency
 def get_db():
@@ -21,4 +127,50 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db(request: Request):
+    """
+    Gets async database session.
+
+    Read-only requests (GET, HEAD) go to a read replica when replicas are configured, unless the same client
+    wrote recently. Everything else, including ``get_current_user`` of write requests, uses the primary.
+    GET routes that write must use :func:`get_primary_db` instead.
+
+    :param request: Current request.
+    :type request: Request
+    :return: Async database session.
+    :rtype: AsyncSession
+    """
+    client = request.headers.get('authorization')
+    session_factory = AsyncSessionLocal
+    if request.method not in READ_METHODS:
+        replica_router.mark_write(client)
+    elif replica_router.replicas and not replica_router.is_sticky(client):
+        session_factory = await replica_router.get_sessionmaker() or AsyncSessionLocal
+    try:
+        async with session_factory() as db:
+            db.info['replica'] = session_factory is not AsyncSessionLocal
+            yield db
+    finally:
+        if request.method not in READ_METHODS:
+            replica_router.mark_write(client)
+
+
+async def get_primary_db(request: Request):
+    """
+    Gets async database session on the primary, for routes that write although their method is GET.
+
+    :param request: Current request.
+    :type request: Request
+    :return: Async database session.
+    :rtype: AsyncSession
+    """
+    client = request.headers.get('authorization')
+    try:
+        async with AsyncSessionLocal() as db:
+            db.info['replica'] = False
+            yield db
+    finally:
+        replica_router.mark_write(client)
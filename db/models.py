@@ -1,10 +1,27 @@
-from sqlalchemy import Column, Integer, String, Boolean, func, Table
-from sqlalchemy.orm import relationship, declarative_base
+from datetime import date
+
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, Boolean, func, Table, Index, DDL, event, table, column, literal_column
+from sqlalchemy.orm import relationship, declarative_base, validates
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy.sql.sqltypes import Date, DateTime
 
 Base = declarative_base()
 
+
+def birthday_key(birthday: date | None) -> int | None:
+    """
+    Gets the year independent birthday key in MMDD form, e.g. 1231 for December 31.
+
+    :param birthday: Date of birth.
+    :type birthday: date | None
+    :return: MMDD key, or None if birthday is unknown.
+    :rtype: int | None
+    """
+    if birthday is None:
+        return None
+    return birthday.month * 100 + birthday.day
+
+
 class Contact(Base):
     __tablename__ = 'contacts'
     id = Column(Integer, primary_key=True)
@@ -13,9 +30,52 @@ class Contact(Base):
     email = Column(String(50), nullable=False)
     phone_number = Column(String(30), nullable=False)
     birthday = Column(Date)
+    birthday_mmdd = Column(SmallInteger)
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
     user = relationship('User', backref='contacts')
 
+    __table_args__ = (
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        Index('ix_contacts_user_id_name', 'user_id', 'name'),
+        Index('ix_contacts_user_id_lastname', 'user_id', 'lastname', 'id'),
+        Index('ix_contacts_user_id_email', 'user_id', 'email'),
+        Index('ix_contacts_user_id_birthday_mmdd', 'user_id', 'birthday_mmdd'),
+    )
+
+    @validates('birthday')
+    def validate_birthday(self, key, birthday):
+        self.birthday_mmdd = birthday_key(birthday)
+        return birthday
+
+
+# Text searched by ``q=``, lower-cased so the trigram index serves case-insensitive matching
+_space = literal_column("' '")
+contact_search_text = func.lower(Contact.name + _space + Contact.lastname + _space + Contact.email + _space + Contact.phone_number)
+
+# Postgres: trigram GIN index, serves ILIKE '%q%' and word similarity (<%)
+event.listen(Base.metadata, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+Index('ix_contacts_search_trgm', contact_search_text.label('search_text'),
+      postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+
+# SQLite: FTS5 shadow table with trigram tokens, kept in sync by triggers
+CONTACTS_FTS_COLUMNS = 'name, lastname, email, phone_number'
+for statement in (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5({CONTACTS_FTS_COLUMNS}, "
+    f"content='contacts', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(rowid, {CONTACTS_FTS_COLUMNS}) VALUES (new.id, new.name, new.lastname, new.email, new.phone_number); END",
+    f"CREATE TRIGGER contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {CONTACTS_FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, old.name, old.lastname, old.email, old.phone_number); END",
+    f"CREATE TRIGGER contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {CONTACTS_FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, old.name, old.lastname, old.email, old.phone_number); "
+    f"INSERT INTO contacts_fts(rowid, {CONTACTS_FTS_COLUMNS}) VALUES (new.id, new.name, new.lastname, new.email, new.phone_number); END",
+):
+    event.listen(Contact.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Contact.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS contacts_fts').execute_if(dialect='sqlite'))
+contacts_fts = table('contacts_fts', column('rowid'), column('rank'), column('contacts_fts'))
+
 
 class User(Base):
     __tablename__ = 'users'
@@ -26,4 +86,26 @@ class User(Base):
     password = Column(String(255), nullable=False)
     created_at = Column('created_at', DateTime, default=func.now())
     avatar = Column(String(255), nullable=True)
+    avatar_hash = Column(String(64), nullable=True)
     refresh_token = Column(String(255), nullable=True)
+
+
+class EmailMessage(Base):
+    __tablename__ = 'email_outbox'
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    template = Column(String(100), nullable=False)
+    context = Column(Text, nullable=False)
+    dedupe_key = Column(String(255))
+    status = Column(String(10), nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=func.now())
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+        Index('ix_email_outbox_dedupe_key', 'dedupe_key'),
+    )
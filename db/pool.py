@@ -0,0 +1,106 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Type
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+
+class PoolStats:
+    """
+    Counters and a checkout wait time histogram for one connection pool.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool: QueuePool | None = None
+        self.buckets = [0] * len(WAIT_BUCKETS)
+        self.wait_sum = 0.0
+        self.wait_count = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def observe_wait(self, seconds: float) -> None:
+        """
+        Records time spent waiting for a connection.
+
+        :param seconds: Wait time in seconds.
+        :type seconds: float
+        :return: None.
+        :rtype: None
+        """
+        with self._lock:
+            self.buckets[bisect_left(WAIT_BUCKETS, seconds)] += 1
+            self.wait_sum += seconds
+            self.wait_count += 1
+
+    def observe_timeout(self) -> None:
+        """
+        Records a checkout that failed with a pool timeout.
+
+        :return: None.
+        :rtype: None
+        """
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        """
+        Gets current pool state and accumulated counters.
+
+        :return: Pool statistics, histogram buckets are cumulative like in Prometheus.
+        :rtype: dict
+        """
+        pool = self.pool
+        with self._lock:
+            cumulative, total = {}, 0
+            for bound, count in zip(WAIT_BUCKETS, self.buckets):
+                total += count
+                cumulative['+Inf' if bound == float('inf') else str(bound)] = total
+            return {
+                'name': self.name,
+                'size': pool.size() if pool else 0,
+                'checked_in': pool.checkedin() if pool else 0,
+                'checked_out': pool.checkedout() if pool else 0,
+                'overflow': max(pool.overflow(), 0) if pool else 0,
+                'timeouts': self.timeouts,
+                'wait_seconds': {'count': self.wait_count, 'sum': self.wait_sum, 'buckets': cumulative},
+            }
+
+
+def instrumented_pool_class(base: Type[QueuePool], stats: PoolStats) -> Type[QueuePool]:
+    """
+    Builds a pool class that reports checkout waits to ``stats``.
+
+    The stats object lives on the class, so pools recreated by ``engine.dispose()`` keep reporting to it.
+
+    :param base: Queue pool class to extend (``QueuePool`` or ``AsyncAdaptedQueuePool``).
+    :type base: Type[QueuePool]
+    :param stats: Statistics collector.
+    :type stats: PoolStats
+    :return: Instrumented pool class.
+    :rtype: Type[QueuePool]
+    """
+
+    class InstrumentedPool(base):
+        pool_stats = stats
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool_stats.pool = self
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                self.pool_stats.observe_timeout()
+                raise
+            finally:
+                self.pool_stats.observe_wait(time.perf_counter() - start)
+
+    InstrumentedPool.__name__ = f'Instrumented{base.__name__}'
+    return InstrumentedPool
@@ -0,0 +1,135 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+SLOWEST_KEPT = 5
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryStats:
+    """
+    Queries executed during one request or one recording: count, total time, slowest and repeated statements.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest: list[tuple[float, str]] = []
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        """
+        Records one executed statement.
+
+        :param statement: SQL statement.
+        :type statement: str
+        :param seconds: Execution time in seconds.
+        :type seconds: float
+        :return: None.
+        :rtype: None
+        """
+        statement = _WHITESPACE.sub(' ', statement).strip()
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+        self.slowest.append((seconds, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[SLOWEST_KEPT:]
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """
+        Gets statements executed at least ``threshold`` times, the usual sign of an N+1 query pattern.
+
+        :param threshold: Minimum number of executions.
+        :type threshold: int
+        :return: Statement and number of executions.
+        :rtype: dict[str, int]
+        """
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+    def report(self) -> str:
+        """
+        Formats the statistics for logs and assertion messages.
+
+        :return: Summary with the slowest and most repeated statements.
+        :rtype: str
+        """
+        lines = [f'{self.count} queries in {self.seconds * 1000:.1f} ms']
+        lines += [f'  slow {seconds * 1000:.1f} ms: {statement}' for seconds, statement in self.slowest]
+        lines += [f'  x{count}: {statement}' for statement, count in self.statements.most_common(3) if count > 1]
+        return '\n'.join(lines)
+
+
+_request_stats: ContextVar[QueryStats | None] = ContextVar('request_query_stats', default=None)
+_recordings: list[QueryStats] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info['query_start'].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    for recording in _recordings:
+        recording.record(statement, seconds)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start'):
+        connection.info['query_start'].pop()
+
+
+def instrument_engine(engine: Engine | AsyncEngine) -> None:
+    """
+    Hooks the cursor execution events of an engine, so its queries are counted.
+
+    :param engine: Engine to instrument.
+    :type engine: Engine | AsyncEngine
+    :return: None.
+    :rtype: None
+    """
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+
+
+def start_request() -> QueryStats:
+    """
+    Starts counting the queries of the current request, i.e. of the current asyncio task and its threads.
+
+    :return: Statistics that fill up while the request runs.
+    :rtype: QueryStats
+    """
+    stats = QueryStats()
+    _request_stats.set(stats)
+    return stats
+
+
+@contextmanager
+def record_queries() -> Iterator[QueryStats]:
+    """
+    Counts every query of instrumented engines while the block runs, in any task or thread; used by tests.
+
+    :return: Statistics that fill up while the block runs.
+    :rtype: Iterator[QueryStats]
+    """
+    stats = QueryStats()
+    _recordings.append(stats)
+    try:
+        yield stats
+    finally:
+        _recordings.remove(stats)
@@ -1,34 +1,44 @@
 from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_limiter import FastAPILimiter
 
-from db.connect_db import get_db
+from db.connect_db import get_async_db, get_pool_stats
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from conf.config import settings
+from services.auth import auth_service
+from services.user_cache import user_cache
+from services.token_store import token_store
+from services.rate_limit import rate_limits
+from services.contacts_cache import contacts_cache
+from services.compression import CompressionMiddleware
+from services.metrics import MetricsMiddleware, metrics
 
 from routes import contacts, auth, users
 import redis.asyncio as redis
 
 app = FastAPI()
 
-origins = ['localhost:3000']
+origins = ['http://localhost:3000']
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=['X-Next-Cursor', 'ETag'],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(contacts.router, prefix='/api')
 app.include_router(auth.router, prefix='/api')
 app.include_router(users.router, prefix='/api')
 
 @app.get("/api/healthchecker")
-def healthchecker(db: Session = Depends(get_db)):
+async def healthchecker(db: AsyncSession = Depends(get_async_db)):
     try:
-        result = db.execute(text("SELECT 1")).fetchone()
+        result = (await db.execute(text("SELECT 1"))).fetchone()
         print(result)
         if result is None:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -39,7 +49,27 @@ def healthchecker(db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Error connecting to the database")
 
+@app.get("/api/healthchecker/pool")
+def pool_stats():
+    return {"pools": get_pool_stats()}
+
+@app.get("/api/healthchecker/hashing")
+def hashing_stats():
+    return auth_service.hashing_pool.stats()
+
+@app.get("/api/healthchecker/rate_limit")
+def rate_limit_stats():
+    return rate_limits.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(await metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.on_event('startup')
 async def startup():
     r = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, encoding='utf-8', decode_responses=True)
-    await FastAPILimiter.init(r)
+    rate_limits.init(r)
+    user_cache.init(r)
+    token_store.init(r)
+    contacts_cache.init(r)
+    metrics.init(r)
@@ -0,0 +1,49 @@
+"""contacts_search_trgm
+
+Revision ID: c3f8a1b7e2d4
+Revises: e7b52d9c4a10
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a1b7e2d4'
+down_revision: Union[str, None] = 'e7b52d9c4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FTS_COLUMNS = 'name, lastname, email, phone_number'
+FTS_NEW = 'new.id, new.name, new.lastname, new.email, new.phone_number'
+FTS_OLD = "'delete', old.id, old.name, old.lastname, old.email, old.phone_number"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5({FTS_COLUMNS}, "
+                   f"content='contacts', content_rowid='id', tokenize='trigram')")
+        op.execute(f"CREATE TRIGGER contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+                   f"INSERT INTO contacts_fts(rowid, {FTS_COLUMNS}) VALUES ({FTS_NEW}); END")
+        op.execute(f"CREATE TRIGGER contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+                   f"INSERT INTO contacts_fts(contacts_fts, rowid, {FTS_COLUMNS}) VALUES ({FTS_OLD}); END")
+        op.execute(f"CREATE TRIGGER contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+                   f"INSERT INTO contacts_fts(contacts_fts, rowid, {FTS_COLUMNS}) VALUES ({FTS_OLD}); "
+                   f"INSERT INTO contacts_fts(rowid, {FTS_COLUMNS}) VALUES ({FTS_NEW}); END")
+        op.execute("INSERT INTO contacts_fts(contacts_fts) VALUES('rebuild')")
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute("CREATE INDEX ix_contacts_search_trgm ON contacts USING gin "
+               "(lower(name || ' ' || lastname || ' ' || email || ' ' || phone_number) gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('contacts_fts_ai', 'contacts_fts_ad', 'contacts_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS contacts_fts')
+        return
+    op.drop_index('ix_contacts_search_trgm', table_name='contacts')
@@ -0,0 +1,30 @@
+"""contacts_birthday_mmdd
+
+Revision ID: e7b52d9c4a10
+Revises: a4c1e2f9d301
+Create Date: 2026-10-18 12:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b52d9c4a10'
+down_revision: Union[str, None] = 'a4c1e2f9d301'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('birthday_mmdd', sa.SmallInteger(), nullable=True))
+    op.execute('UPDATE contacts SET birthday_mmdd = CAST(EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday) AS SMALLINT) '
+               'WHERE birthday IS NOT NULL')
+    op.create_index('ix_contacts_user_id_birthday_mmdd', 'contacts', ['user_id', 'birthday_mmdd'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_mmdd', table_name='contacts')
+    op.drop_column('contacts', 'birthday_mmdd')
@@ -1,14 +1,21 @@
-from typing import List
-from datetime import datetime, timedelta
+from typing import Dict, List, AsyncIterator, Sequence, Set, Tuple
+from datetime import date, timedelta
 
-from sqlalchemy.orm import Session
-from sqlalchemy import extract, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from sqlalchemy import select, insert, update, delete, and_, or_, tuple_, func, literal
 
-from db.models import Contact, User
-from schemas import ContactModel
+from db.models import Contact, User, birthday_key, contact_search_text, contacts_fts
+from schemas import ContactModel, ContactBatchUpdate
+from services.contacts_cache import contacts_cache
 
 
-async def create_contact(body: ContactModel, user: User, db: Session) -> Contact:
+def _load_only(fields: Sequence[str] | None, *required: str):
+    names = dict.fromkeys((*fields, *required)) if fields else ()
+    return [load_only(*(getattr(Contact, name) for name in names))] if names else []
+
+
+async def create_contact(body: ContactModel, user: User, db: AsyncSession) -> Contact:
     """
     Creates new contact for specific user.
 
@@ -17,20 +24,45 @@ async def create_contact(body: ContactModel, user: User, db: Session) -> Contact
     :param user: User for which contact will create.
     :type user: User
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: Created contact.
     :rtype: Contact
     """
-    contact = Contact(name=body.name, lastname=body.lastname, email=body.email, phone_number=body.phone_number, birthday=body.birthday, user=user)
+    contact = Contact(name=body.name, lastname=body.lastname, email=body.email, phone_number=body.phone_number, birthday=body.birthday, user_id=user.id)
     db.add(contact)
-    db.commit()
-    db.refresh(contact)
+    await db.commit()
+    await contacts_cache.bump(user.id)
+    await db.refresh(contact)
     return contact
 
 
-async def get_contacts(name: str | None, lastname: str | None, email: str | None, user: User, db: Session) -> List[Contact]:
+async def create_contacts(bodies: List[ContactModel], user: User, db: AsyncSession) -> int:
+    """
+    Creates many contacts for specific user with a single multi-row insert.
+
+    :param bodies: The data for the contacts to create.
+    :type bodies: List[ContactModel]
+    :param user: User for which contacts will create.
+    :type user: User
+    :param db: Database session.
+    :type db: AsyncSession
+    :return: Number of created contacts.
+    :rtype: int
+    """
+    if not bodies:
+        return 0
+    rows = [dict(body.model_dump(), birthday_mmdd=birthday_key(body.birthday), user_id=user.id) for body in bodies]
+    await db.execute(insert(Contact), rows)
+    await db.commit()
+    await contacts_cache.bump(user.id)
+    return len(rows)
+
+
+async def get_contacts(name: str | None, lastname: str | None, email: str | None, user: User, db: AsyncSession,
+                       limit: int | None = None, after: tuple | None = None, order_by: str = 'id',
+                       fields: Sequence[str] | None = None) -> List[Contact]:
     """
-    Gets list of all contacts for specific user.
+    Gets a page of contacts for specific user, using keyset pagination.
 
     :param name: First name of the contact (OPTIONAL).
     :type name: str | None
@@ -41,21 +73,116 @@ async def get_contacts(name: str | None, lastname: str | None, email: str | None
     :param user: User for which contacts will retrieve.
     :type user: User | None
     :param db: Database session.
-    :type db: Session | None
+    :type db: AsyncSession | None
+    :param limit: Maximum number of contacts to return, all contacts if None (OPTIONAL).
+    :type limit: int | None
+    :param after: Sort key values of the last contact from the previous page (OPTIONAL).
+    :type after: tuple | None
+    :param order_by: Sort key, ``id`` or ``lastname`` (ties are broken by id).
+    :type order_by: str
+    :param fields: Columns to load, all columns if None (OPTIONAL).
+    :type fields: Sequence[str] | None
     :return: List of contacts.
     :rtype: List[Contact]
     """
-    q = db.query(Contact)
+    sort_columns = (Contact.lastname, Contact.id) if order_by == 'lastname' else (Contact.id,)
+    q = select(Contact).options(*_load_only(fields, *(column.key for column in sort_columns))).filter(Contact.user_id == user.id)
     if name:
-        return q.filter(and_(Contact.name == name, Contact.user_id == user.id)).all()
-    elif lastname:
-        return q.filter(and_(Contact.lastname == lastname, Contact.user_id == user.id)).all()
-    elif email:
-        return q.filter(and_(Contact.email == email, Contact.user_id == user.id)).all()
-    return q.filter(Contact.user_id == user.id).all()
+        q = q.filter(Contact.name == name)
+    if lastname:
+        q = q.filter(Contact.lastname == lastname)
+    if email:
+        q = q.filter(Contact.email == email)
+    if after:
+        q = q.filter(tuple_(*sort_columns) > tuple_(*after))
+    q = q.order_by(*sort_columns).limit(limit)
+    contacts = await db.scalars(q)
+    return contacts.all()
+
+
+# Share of query trigrams a contact must contain to be a fuzzy match on SQLite
+SEARCH_SIMILARITY_THRESHOLD = 0.5
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _trigrams(value: str) -> List[str]:
+    return list(dict.fromkeys(value[i:i + 3] for i in range(len(value) - 2)))
+
+
+def _trigram_ratio(trigrams: List[str], contact: Contact) -> float:
+    search_text = ' '.join((contact.name, contact.lastname, contact.email, contact.phone_number)).lower()
+    return sum(trigram in search_text for trigram in trigrams) / len(trigrams)
+
+
+async def search_contacts(q: str, user: User, db: AsyncSession, limit: int = 100) -> List[Contact]:
+    """
+    Searches contacts of specific user by name, last name, email or phone number.
+
+    Matching is case-insensitive and ranks substring (including prefix) matches first, followed by
+    fuzzy trigram matches. Postgres uses the pg_trgm GIN index, SQLite the ``contacts_fts`` FTS5 table.
+
+    :param q: Search query.
+    :type q: str
+    :param user: User for which contacts will retrieve.
+    :type user: User
+    :param db: Database session.
+    :type db: AsyncSession
+    :param limit: Maximum number of contacts to return.
+    :type limit: int
+    :return: List of contacts, best matches first.
+    :rtype: List[Contact]
+    """
+    q = q.strip().lower()
+    if not q:
+        return []
+    stmt = select(Contact).filter(Contact.user_id == user.id)
+    substring = contact_search_text.like(f'%{_escape_like(q)}%', escape='\\')
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        fuzzy = literal(q).op('<%')(contact_search_text)
+        stmt = stmt.filter(or_(substring, fuzzy))\
+            .order_by(substring.desc(), func.word_similarity(q, contact_search_text).desc(), Contact.id)
+    elif dialect == 'sqlite' and len(q) >= 3:
+        match = ' OR '.join('"{}"'.format(trigram.replace('"', '""')) for trigram in _trigrams(q))
+        fts = select(contacts_fts.c.rowid, contacts_fts.c.rank).where(contacts_fts.c.contacts_fts.op('MATCH')(match)).subquery()
+        stmt = stmt.join(fts, Contact.id == fts.c.rowid).order_by(substring.desc(), fts.c.rank, Contact.id)
+        # FTS5 has no similarity threshold, so candidates sharing only a few trigrams are dropped here
+        trigrams = _trigrams(q)
+        candidates = await db.scalars(stmt.limit(limit * 5))
+        return [contact for contact in candidates.all()
+                if _trigram_ratio(trigrams, contact) >= SEARCH_SIMILARITY_THRESHOLD][:limit]
+    else:
+        stmt = stmt.filter(substring).order_by(Contact.id)
+    contacts = await db.scalars(stmt.limit(limit))
+    return contacts.all()
+
+
+async def stream_contacts(user: User, db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[dict]:
+    """
+    Streams all contacts of specific user through a server-side cursor.
+
+    Plain column rows are fetched ``batch_size`` at a time, no ORM objects are built.
+
+    :param user: User for which contacts will retrieve.
+    :type user: User
+    :param db: Database session.
+    :type db: AsyncSession
+    :param batch_size: Number of rows fetched per round trip.
+    :type batch_size: int
+    :return: Contact rows as mappings.
+    :rtype: AsyncIterator[dict]
+    """
+    q = select(Contact.id, Contact.name, Contact.lastname, Contact.email, Contact.phone_number, Contact.birthday)\
+        .filter(Contact.user_id == user.id).order_by(Contact.id).execution_options(yield_per=batch_size)
+    result = await db.stream(q)
+    async for row in result.mappings():
+        yield row
 
 
-async def get_contact(contact_id: int, user: User, db: Session) -> Contact | None:
+async def get_contact(contact_id: int, user: User, db: AsyncSession, fields: Sequence[str] | None = None) -> Contact | None:
     """
     Gets specific contact for specific user.
 
@@ -64,14 +191,16 @@ async def get_contact(contact_id: int, user: User, db: Session) -> Contact | Non
     :param user: User for which contact will retrieve.
     :type user: User
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
+    :param fields: Columns to load, all columns if None (OPTIONAL).
+    :type fields: Sequence[str] | None
     :return: Contact by specific id, or None if contact does not exist.
     :rtype: Contact | None
     """
-    return db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    return await db.scalar(select(Contact).options(*_load_only(fields)).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)))
 
 
-async def update_contact(contact_id: int, body: ContactModel, user: User, db: Session) -> Contact | None:
+async def update_contact(contact_id: int, body: ContactModel, user: User, db: AsyncSession) -> Contact | None:
     """
     Updates specific contact for specific user.
 
@@ -82,22 +211,23 @@ async def update_contact(contact_id: int, body: ContactModel, user: User, db: Se
     :param user: User for which contact will update.
     :type user: User
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: Updated contact, or None if contact does not exist.
     :rtype: Contact | None
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    contact = await db.scalar(select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)))
     if contact:
         contact.name = body.name
         contact.lastname = body.lastname
         contact.email = body.email
         contact.phone_number = body.phone_number
         contact.birthday = body.birthday
-        db.commit()
+        await db.commit()
+        await contacts_cache.bump(user.id)
     return contact
 
 
-async def delete_contact(contact_id: int, user: User, db: Session) -> Contact | None:
+async def delete_contact(contact_id: int, user: User, db: AsyncSession) -> Contact | None:
     """
     Deletes specific contact for specific user.
 
@@ -106,32 +236,94 @@ async def delete_contact(contact_id: int, user: User, db: Session) -> Contact |
     :param user: User for which contact will delete.
     :type user: User
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: Deleted contact, or None if contact does not exist.
     :rtype: Contact | None
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    contact = await db.scalar(select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)))
     if contact:
-        db.delete(contact)
-        db.commit()
+        await db.delete(contact)
+        await db.commit()
+        await contacts_cache.bump(user.id)
     return contact
 
-async def get_contacts_with_nearest_birthday(user: User, db: Session) -> List[Contact]:
+
+async def batch_contacts(get_ids: List[int], updates: List[ContactBatchUpdate], delete_ids: List[int], user: User,
+                         db: AsyncSession) -> Tuple[Dict[int, Contact], Set[int]]:
+    """
+    Applies partial updates and deletes to many contacts of specific user in one transaction, then loads contacts.
+
+    Updates run as one bulk UPDATE by primary key, deletes as one DELETE with ``IN``, and the contacts to return
+    are read with one SELECT with ``IN``; every statement is limited to the user's contacts. Updates are applied
+    before deletes, so the returned contacts reflect both.
+
+    :param get_ids: Ids of contacts to load.
+    :type get_ids: List[int]
+    :param updates: Partial updates, only the fields that are set and not null are changed.
+    :type updates: List[ContactBatchUpdate]
+    :param delete_ids: Ids of contacts to delete.
+    :type delete_ids: List[int]
+    :param user: User whose contacts are changed.
+    :type user: User
+    :param db: Database session.
+    :type db: AsyncSession
+    :return: Existing contacts among the loaded and updated ids, and ids of deleted contacts.
+    :rtype: Tuple[Dict[int, Contact], Set[int]]
+    """
+    rows = []
+    for item in updates:
+        values = {field: value for field, value in item.model_dump(exclude_unset=True).items() if value is not None}
+        if 'birthday' in values:
+            values['birthday_mmdd'] = birthday_key(values['birthday'])
+        if len(values) > 1:
+            rows.append(values)
+    if rows:
+        await db.execute(update(Contact).where(Contact.user_id == user.id), rows,
+                         execution_options={'synchronize_session': None})
+
+    deleted = set()
+    if delete_ids:
+        result = await db.execute(delete(Contact).where(and_(Contact.user_id == user.id, Contact.id.in_(delete_ids)))
+                                  .returning(Contact.id))
+        deleted = set(result.scalars().all())
+
+    contacts = {}
+    load_ids = set(get_ids) | {item.id for item in updates}
+    if load_ids:
+        result = await db.scalars(select(Contact).filter(and_(Contact.user_id == user.id, Contact.id.in_(load_ids)))
+                                  .execution_options(populate_existing=True))
+        contacts = {contact.id: contact for contact in result.all()}
+
+    await db.commit()
+    if rows or deleted:
+        await contacts_cache.bump(user.id)
+    return contacts, deleted
+
+
+async def get_contacts_with_nearest_birthday(user: User, db: AsyncSession, days: int = 7,
+                                             fields: Sequence[str] | None = None) -> List[Contact]:
     """
-    Gets list of contacts whose birthday in the nearest week.
+    Gets list of contacts whose birthday is within the given number of days, starting today.
 
     :param user: User for which contacts will retrieve.
     :type user: User
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
+    :param days: Window size in days, today included.
+    :type days: int
+    :param fields: Columns to load, all columns if None (OPTIONAL).
+    :type fields: Sequence[str] | None
     :return: List of contacts.
     :rtype: List[Contact]
     """
-    today = datetime.now()
-    contacts = db.query(Contact).filter(and_(
-    extract('month', Contact.birthday) == today.month,
-    extract('day', Contact.birthday) >= today.day,
-    extract('day', Contact.birthday) < today.day + 7,
-    Contact.user_id == user.id
-    )).all()
-    return contacts
+    today = date.today()
+    start = birthday_key(today)
+    end = birthday_key(today + timedelta(days=days - 1))
+    if days >= 366:
+        window = Contact.birthday_mmdd.is_not(None)
+    elif start <= end:
+        window = Contact.birthday_mmdd.between(start, end)
+    else:
+        window = or_(Contact.birthday_mmdd >= start, Contact.birthday_mmdd <= end)
+    contacts = await db.scalars(select(Contact).options(*_load_only(fields)).filter(and_(Contact.user_id == user.id, window)).order_by(Contact.birthday_mmdd < start, Contact.birthday_mmdd))
+    return contacts.all()
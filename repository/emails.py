@@ -0,0 +1,105 @@
+import json
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import EmailMessage
+
+
+async def enqueue_email(recipient: str, subject: str, template: str, context: dict, db: AsyncSession,
+                        dedupe_key: str | None = None, commit: bool = True) -> EmailMessage:
+    """
+    Puts an email into the outbox. A pending email with the same dedupe key is returned instead of a new one.
+
+    :param recipient: Email address of the recipient.
+    :type recipient: str
+    :param subject: Email subject.
+    :type subject: str
+    :param template: Template file name.
+    :type template: str
+    :param context: Template variables.
+    :type context: dict
+    :param db: Database session.
+    :type db: AsyncSession
+    :param dedupe_key: Key of emails that must not be queued twice (OPTIONAL).
+    :type dedupe_key: str | None
+    :param commit: Commit right away, False leaves the email to be committed with the caller's other changes.
+    :type commit: bool
+    :return: Queued email.
+    :rtype: EmailMessage
+    """
+    if dedupe_key:
+        pending = await db.scalar(select(EmailMessage).filter(and_(EmailMessage.dedupe_key == dedupe_key,
+                                                                   EmailMessage.status == 'pending')))
+        if pending:
+            return pending
+    message = EmailMessage(recipient=recipient, subject=subject, template=template, context=json.dumps(context),
+                           dedupe_key=dedupe_key, status='pending', attempts=0, next_attempt_at=datetime.utcnow())
+    db.add(message)
+    if commit:
+        await db.commit()
+    return message
+
+
+async def get_due_emails(batch_size: int, db: AsyncSession) -> List[EmailMessage]:
+    """
+    Gets pending emails whose next attempt is due and locks them, skipping rows locked by other workers.
+
+    :param batch_size: Maximum number of emails.
+    :type batch_size: int
+    :param db: Database session.
+    :type db: AsyncSession
+    :return: List of emails.
+    :rtype: List[EmailMessage]
+    """
+    messages = await db.scalars(
+        select(EmailMessage)
+        .filter(and_(EmailMessage.status == 'pending', EmailMessage.next_attempt_at <= datetime.utcnow()))
+        .order_by(EmailMessage.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return messages.all()
+
+
+def mark_sent(message: EmailMessage) -> None:
+    """
+    Marks an email as sent, changes are saved with the next commit.
+
+    :param message: Sent email.
+    :type message: EmailMessage
+    :return: None.
+    :rtype: None
+    """
+    message.status = 'sent'
+    message.attempts += 1
+    message.sent_at = datetime.utcnow()
+    message.last_error = None
+
+
+def mark_failed(message: EmailMessage, error: str, max_attempts: int, backoff: float, max_backoff: float) -> None:
+    """
+    Schedules a retry with exponential backoff, or gives up after ``max_attempts``.
+
+    :param message: Failed email.
+    :type message: EmailMessage
+    :param error: Error description.
+    :type error: str
+    :param max_attempts: Attempts before the email is marked as failed.
+    :type max_attempts: int
+    :param backoff: Delay before the first retry, in seconds; doubled on every attempt.
+    :type backoff: float
+    :param max_backoff: Upper bound of the delay, in seconds.
+    :type max_backoff: float
+    :return: None.
+    :rtype: None
+    """
+    message.attempts += 1
+    message.last_error = error
+    if message.attempts >= max_attempts:
+        message.status = 'failed'
+        return
+    delay = min(backoff * 2 ** (message.attempts - 1), max_backoff)
+    message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
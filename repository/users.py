@@ -1,31 +1,33 @@
 from schemas import UserModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import User
 from libgravatar import Gravatar
+from services.user_cache import user_cache
 
-async def get_user_by_email(email: str, db: Session) -> User:
+async def get_user_by_email(email: str, db: AsyncSession) -> User:
     """
     Gets user by email address.
 
     :param email: Email address.
     :type email: str
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: User.
     :rtype: User
     """
-    return db.query(User).filter(User.email == email).first()
+    return await db.scalar(select(User).filter(User.email == email))
 
 
-async def create_user(body: UserModel, db: Session) -> User:
+async def create_user(body: UserModel, db: AsyncSession) -> User:
     """
     Creates new user.
 
     :param body: Data for contact.
     :type body: UserModel
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: Created user.
     :rtype: User
     """
@@ -38,11 +40,11 @@ async def create_user(body: UserModel, db: Session) -> User:
 
     new_user = User(**body.model_dump(), avatar=avatar)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
-async def update_token(user: User, token: str | None, db: Session) -> None:
+async def update_token(user: User, token: str | None, db: AsyncSession) -> None:
     """
     Updates refresh token for specific user.
 
@@ -51,29 +53,31 @@ async def update_token(user: User, token: str | None, db: Session) -> None:
     :param token: Refresh token.
     :type token: str | None
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: None.
     :rtype: None
     """
     user.refresh_token = token
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(user.email)
 
-async def confirmed_email(email: str, db: Session) -> None:
+async def confirmed_email(email: str, db: AsyncSession) -> None:
     """
     Confirms email for specific user.
 
     :param email: Email address.
     :type email: str
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: None.
     :rtype: None
     """
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
 
-async def update_avatar(email: str, url: str, db: Session) -> User:
+async def update_avatar(email: str, url: str, db: AsyncSession, avatar_hash: str | None = None) -> User:
     """
     Updates avatar for specific user.
 
@@ -82,11 +86,15 @@ async def update_avatar(email: str, url: str, db: Session) -> User:
     :param url: Cloudinary URL address.
     :type url: str
     :param db: Database session.
-    :type db: Session
+    :type db: AsyncSession
+    :param avatar_hash: SHA-256 of the uploaded image (OPTIONAL).
+    :type avatar_hash: str | None
     :return: Updated user.
     :rtype: User
     """
     user = await get_user_by_email(email, db)
     user.avatar = url
-    db.commit()
+    user.avatar_hash = avatar_hash
+    await db.commit()
+    await user_cache.invalidate(email)
     return user
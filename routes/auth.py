@@ -1,30 +1,33 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Security, BackgroundTasks, Request
+from fastapi import APIRouter, HTTPException, status, Depends, Security, Request
 from fastapi.security import HTTPBearer, OAuth2PasswordRequestForm, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.connect_db import get_db
+from db.connect_db import get_async_db, get_primary_db
 from schemas import UserModel, UserResponse, TokenModel, RequestEmail
 from repository import users as repository_users
 from services.auth import auth_service
 from services.email import send_email
+from services.token_store import token_store
+from conf.config import settings
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 security = HTTPBearer()
 
 
 @router.post('/signup', response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+async def signup(body: UserModel, request: Request, db: AsyncSession = Depends(get_async_db)):
     exist_user = await repository_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Account already exists')
     body.password = await auth_service.get_password_hash(body.password)
+    # Queued before the user is added, so the user and the confirmation email are committed together
+    await send_email(body.email, body.username, request.base_url, db, commit=False)
     new_user = await repository_users.create_user(body, db)
-    background_tasks.add_task(send_email, new_user.email, new_user.username, request.base_url)
     return {'user': new_user, 'detail': 'User successfully created. Please be sure to check your email for '
                                         'confirmation.'}
 
 @router.post('/login', response_model=TokenModel)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     user = await repository_users.get_user_by_email(body.username, db)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid email')
@@ -34,26 +37,24 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid password')
 
     access_token = await auth_service.create_access_token(data={'sub': user.email})
-    refresh_token = await auth_service.create_refresh_token(data={'sub': user.email})
-    await repository_users.update_token(user, refresh_token, db)
+    jti, family = await token_store.issue(user.email)
+    refresh_token = await auth_service.create_refresh_token(data={'sub': user.email, 'jti': jti, 'fam': family},
+                                                            expires_delta=settings.refresh_token_ttl)
     return {'access_token': access_token, 'refresh_token': refresh_token, 'token_type': 'bearer'}
 
 @router.get('/refresh_token', response_model=TokenModel)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
-    token = credentials.credentials
-    email = await auth_service.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
-    if user.refresh_token != token:
-        await repository_users.update_token(user, None, db)
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid refresh token')
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security)):
+    payload = await auth_service.decode_refresh_token(credentials.credentials)
+    email = payload['sub']
+    jti, family = await token_store.rotate(payload)
 
     access_token = await auth_service.create_access_token(data={'sub': email})
-    refresh_token = await auth_service.create_refresh_token(data={'sub': email})
-    await repository_users.update_token(user, refresh_token, db)
+    refresh_token = await auth_service.create_refresh_token(data={'sub': email, 'jti': jti, 'fam': family},
+                                                            expires_delta=settings.refresh_token_ttl)
     return {'access_token': access_token, 'refresh_token': refresh_token, 'token_type': 'bearer'}
 
 @router.get('/confirmed_email/{token}')
-async def confirmed_email(token: str, db: Session = Depends(get_db)):
+async def confirmed_email(token: str, db: AsyncSession = Depends(get_primary_db)):
     email = await auth_service.get_email_from_token(token)
     user = await repository_users.get_user_by_email(email, db)
     if user is None:
@@ -65,10 +66,10 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
     return {'message': 'Email confirmed'}
 
 @router.post('/request_email')
-async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+async def request_email(body: RequestEmail, request: Request, db: AsyncSession = Depends(get_async_db)):
     user = await repository_users.get_user_by_email(body.email, db)
     if user.confirmed:
         return {'message': 'Email is already confirmed'}
     if user:
-        background_tasks.add_task(send_email, user.email, user.username, request.base_url)
+        await send_email(user.email, user.username, request.base_url, db)
     return {'message': 'Check your email for confirmation'}
@@ -1,41 +1,110 @@
-from typing import List
+from datetime import date
+from typing import List, Literal
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import EmailStr
 
-from db.connect_db import get_db
-from db.models import User
-from schemas import ContactModel, ContactResponse
+from db.connect_db import get_async_db, is_replica_session
+from db.models import User, birthday_key
+from schemas import ContactModel, ContactResponse, ContactImportResponse, ContactBatchRequest, ContactBatchResponse
 from repository import contacts as repository_contacts
 from services.auth import auth_service
+from services.pagination import DEFAULT_PAGE_SIZE, encode_cursor, decode_cursor
+from services.rate_limit import RateLimiter
+from services.projection import parse_fields, serialize, to_dict
+from services.contacts_cache import contacts_cache
+from services.contacts_import import import_contacts as import_contacts_stream
+from services.contacts_export import export_contacts as export_contacts_stream, MEDIA_TYPES
+from conf.config import settings
 
 router = APIRouter(prefix='/contacts', tags=['contacts'])
 
 
-@router.get('/', response_model=List[ContactResponse])
-async def get_contacts(name: str | None = None, lastname: str | None = None, email: EmailStr | None = None, nearest_birthday: bool = False, db: Session = Depends(get_db),
-                    current_user: User = Depends(auth_service.get_current_user)):
+@router.get('/', response_model=List[ContactResponse], description='Returns all matching contacts unless limit or cursor is given. Pages are limited to limit (default 100) '
+                                                                    'contacts and the next page cursor is sent in the X-Next-Cursor header. '
+                                                                    'Search results (q) are ranked by relevance and not paginated. '
+                                                                    'fields=name,lastname limits the returned fields, id is always included. '
+                                                                    'Responses carry an ETag, send it in If-None-Match to get 304 while the contacts are unchanged')
+async def get_contacts(request: Request, name: str | None = None, lastname: str | None = None, email: EmailStr | None = None, q: str | None = None, nearest_birthday: bool = False, birthday_days: int = Query(7, ge=1, le=366),
+                    limit: int | None = Query(None, ge=1, le=1000), cursor: str | None = None, order_by: Literal['id', 'lastname'] = 'id', fields: str | None = None,
+                    db: AsyncSession = Depends(get_async_db), current_user: User = Depends(auth_service.get_current_user)):
+    fields = parse_fields(fields)
+    # The birthday window moves with the date, so the day is part of the cache key
+    variant = str(birthday_key(date.today())) if nearest_birthday else ''
+    cached = await contacts_cache.lookup(current_user.id, request, cacheable=not is_replica_session(db), variant=variant)
+    if cached.response:
+        return cached.response
+    headers = {}
     if nearest_birthday:
-        return await repository_contacts.get_contacts_with_nearest_birthday(current_user, db)
-    return await repository_contacts.get_contacts(name, lastname, email, current_user, db)
+        contacts = await repository_contacts.get_contacts_with_nearest_birthday(current_user, db, birthday_days, fields=fields)
+    elif q:
+        contacts = await repository_contacts.search_contacts(q, current_user, db, limit or DEFAULT_PAGE_SIZE)
+    else:
+        after = decode_cursor(order_by, cursor)
+        if after is not None and limit is None:
+            limit = DEFAULT_PAGE_SIZE
+        contacts = await repository_contacts.get_contacts(name, lastname, email, current_user, db, limit=limit, after=after,
+                                                          order_by=order_by, fields=fields)
+        if len(contacts) == limit:
+            headers['X-Next-Cursor'] = encode_cursor(order_by, contacts[-1])
+    return await contacts_cache.store(cached, serialize(contacts, fields), headers)
 
 @router.post('/', response_model=ContactResponse, description='No more than 4 request per 10 seconds', dependencies=[Depends(RateLimiter(times=4, seconds=10))])
-async def create_contact(body: ContactModel, db: Session = Depends(get_db),
+async def create_contact(body: ContactModel, db: AsyncSession = Depends(get_async_db),
                     current_user: User = Depends(auth_service.get_current_user)):
     return await repository_contacts.create_contact(body, current_user, db)
 
-@router.get('/{contact_id}', response_model=ContactResponse)
-async def get_contact(contact_id: int, db: Session = Depends(get_db),
+@router.post('/import', response_model=ContactImportResponse, status_code=status.HTTP_201_CREATED,
+             description='Streams a text/csv (with header row) or application/x-ndjson request body')
+async def import_contacts(request: Request, db: AsyncSession = Depends(get_async_db),
+                    current_user: User = Depends(auth_service.get_current_user)):
+    return await import_contacts_stream(request.stream(), request.headers.get('content-type'), current_user, db,
+                                        settings.contacts_import_batch_size)
+
+@router.post('/batch', response_model=ContactBatchResponse,
+             description='Gets, partially updates and deletes up to 1000 contacts each in one transaction. '
+                         'Updates are applied before deletes, every item gets status 200 or 404')
+async def batch_contacts(body: ContactBatchRequest, db: AsyncSession = Depends(get_async_db),
+                    current_user: User = Depends(auth_service.get_current_user)):
+    contacts, deleted = await repository_contacts.batch_contacts(body.get, body.update, body.delete, current_user, db)
+
+    def result(contact_id: int) -> dict:
+        contact = contacts.get(contact_id)
+        if contact is None:
+            return {'id': contact_id, 'status': status.HTTP_404_NOT_FOUND, 'contact': None}
+        return {'id': contact_id, 'status': status.HTTP_200_OK, 'contact': to_dict(contact)}
+
+    return Response(orjson.dumps({
+        'get': [result(contact_id) for contact_id in body.get],
+        'update': [result(item.id) for item in body.update],
+        'delete': [{'id': contact_id, 'status': status.HTTP_200_OK if contact_id in deleted else status.HTTP_404_NOT_FOUND}
+                   for contact_id in body.delete],
+    }), media_type='application/json')
+
+@router.get('/export', response_class=StreamingResponse, description='Streams all contacts as NDJSON or CSV')
+async def export_contacts(format: Literal['ndjson', 'csv'] = 'ndjson', db: AsyncSession = Depends(get_async_db),
                     current_user: User = Depends(auth_service.get_current_user)):
-    contact = await repository_contacts.get_contact(contact_id, current_user, db)
+    rows = repository_contacts.stream_contacts(current_user, db, settings.contacts_export_batch_size)
+    return StreamingResponse(export_contacts_stream(rows, format), media_type=MEDIA_TYPES[format],
+                             headers={'Content-Disposition': f'attachment; filename="contacts.{format}"'})
+
+@router.get('/{contact_id}', response_model=ContactResponse, description='fields=name,lastname limits the returned fields, id is always included')
+async def get_contact(contact_id: int, request: Request, fields: str | None = None, db: AsyncSession = Depends(get_async_db),
+                    current_user: User = Depends(auth_service.get_current_user)):
+    fields = parse_fields(fields)
+    cached = await contacts_cache.lookup(current_user.id, request, cacheable=not is_replica_session(db))
+    if cached.response:
+        return cached.response
+    contact = await repository_contacts.get_contact(contact_id, current_user, db, fields=fields)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Contact not found')
-    return contact
+    return await contacts_cache.store(cached, serialize(contact, fields))
 
 @router.put('/{contact_id}', response_model=ContactResponse)
-async def update_contact(contact_id: int, body: ContactModel, db: Session = Depends(get_db),
+async def update_contact(contact_id: int, body: ContactModel, db: AsyncSession = Depends(get_async_db),
                     current_user: User = Depends(auth_service.get_current_user)):
     contact = await repository_contacts.update_contact(contact_id, body, current_user, db)
     if contact is None:
@@ -43,7 +112,7 @@ async def update_contact(contact_id: int, body: ContactModel, db: Session = Depe
     return contact
 
 @router.delete('/{contact_id}', response_model=ContactResponse)
-async def delete_contact(contact_id: int, db: Session = Depends(get_db),
+async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_async_db),
                     current_user: User = Depends(auth_service.get_current_user)):
     contact = await repository_contacts.delete_contact(contact_id, current_user, db)
     if contact is None:
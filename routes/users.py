@@ -1,13 +1,11 @@
 from fastapi import APIRouter, Depends, status, UploadFile, File
-from sqlalchemy.orm import Session
-import cloudinary
-import cloudinary.uploader
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.connect_db import get_db
+from db.connect_db import get_async_db
 from db.models import User
 from repository import users as repository_users
 from services.auth import auth_service
-from conf.config import settings
+from services.avatar import avatar_service
 from schemas import UserDb
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -20,16 +18,10 @@ async def read_users_me(current_user: User = Depends(auth_service.get_current_us
 
 @router.patch('/avatar', response_model=UserDb)
 async def update_avatar_user(file: UploadFile = File(), current_user: User = Depends(auth_service.get_current_user),
-                             db: Session = Depends(get_db)):
-    cloudinary.config(
-        cloud_name=settings.cloudinary_name,
-        api_key=settings.cloudinary_api_key,
-        api_secret=settings.cloudinary_api_secret,
-        secure=True
-    )
-
-    r = cloudinary.uploader.upload(file.file, public_id=f'QuotesApp/{current_user.username}', overwrite=True)
-    src_url = cloudinary.CloudinaryImage(f'QuotesApp/{current_user.username}')\
-                        .build_url(width=250, height=250, crop='fill', version=r.get('version'))
-    user = await repository_users.update_avatar(current_user.email, src_url, db)
+                             db: AsyncSession = Depends(get_async_db)):
+    avatar = await avatar_service.upload(file, f'QuotesApp/{current_user.username}', current_user.avatar_hash)
+    if avatar is None:
+        return current_user
+    src_url, avatar_hash = avatar
+    user = await repository_users.update_avatar(current_user.email, src_url, db, avatar_hash)
     return user
\ No newline at end of file
@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from datetime import date, datetime
 from pydantic_extra_types.phone_numbers import PhoneNumber
@@ -17,6 +19,44 @@ class ContactResponse(ContactModel):
     id: int
 
 
+class ContactImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ContactImportResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ContactImportError]
+
+
+class ContactBatchUpdate(BaseModel):
+    id: int
+    name: str | None = Field(None, max_length=50)
+    lastname: str | None = Field(None, max_length=50)
+    email: EmailStr | None = Field(None, max_length=50)
+    phone_number: PhoneNumber | None = Field(None, max_length=30)
+    birthday: date | None = None
+
+
+class ContactBatchRequest(BaseModel):
+    get: List[int] = Field([], max_length=1000)
+    update: List[ContactBatchUpdate] = Field([], max_length=1000)
+    delete: List[int] = Field([], max_length=1000)
+
+
+class ContactBatchResult(BaseModel):
+    id: int
+    status: int
+    contact: ContactResponse | None = None
+
+
+class ContactBatchResponse(BaseModel):
+    get: List[ContactBatchResult]
+    update: List[ContactBatchResult]
+    delete: List[ContactBatchResult]
+
+
 class UserModel(BaseModel):
     username: str = Field(min_length=5, max_length=16)
     email: EmailStr
@@ -1,27 +1,32 @@
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from db.connect_db import get_db
+from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.connect_db import get_async_db, is_replica_session
 from repository import users as repository_users
 from conf.config import settings
+from services.hashing import HashingPool
+from services.jwt_signer import JWTSigner
+from services.user_cache import user_cache
 
 from typing import Optional
 
 from datetime import datetime, timedelta
 
 class Auth:
-    pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+    pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto', bcrypt__rounds=settings.bcrypt_rounds)
+    hashing_pool = HashingPool(settings.password_hash_workers, settings.password_hash_queue_limit)
     SECRET_KEY = settings.secret_key
     ALGORITHM = settings.algorithm
+    signer = JWTSigner.from_settings(settings)
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/api/auth/login')
 
     async def verify_password(self, plain_password, hashed_password):
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return await self.hashing_pool.run(self.pwd_context.verify, plain_password, hashed_password)
 
     async def get_password_hash(self, password):
-        return self.pwd_context.hash(password)
+        return await self.hashing_pool.run(self.pwd_context.hash, password)
 
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
         to_encode = data.copy()
@@ -30,7 +35,7 @@ class Auth:
         else:
             expire = datetime.utcnow() + timedelta(days=7)
         to_encode.update({'iat': datetime.utcnow(), 'exp': expire, 'scope': 'access_token'})
-        encoded_access_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        encoded_access_token = self.signer.encode(to_encode)
         return encoded_access_token
 
     async def create_refresh_token(self, data: dict, expires_delta: Optional[float] = None):
@@ -40,20 +45,19 @@ class Auth:
         else:
             expire = datetime.utcnow() + timedelta(days=7)
         to_encode.update({'iat': datetime.utcnow(), 'exp': expire, 'scope': 'refresh_token'})
-        encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        encoded_refresh_token = self.signer.encode(to_encode)
         return encoded_refresh_token
 
     async def decode_refresh_token(self, refresh_token: str):
         try:
-            payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=self.ALGORITHM)
+            payload = self.signer.decode(refresh_token)
             if payload['scope'] == 'refresh_token':
-                email = payload['sub']
-                return email
+                return payload
             raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
         except JWTError:
             raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Could not validate credentials',
@@ -61,7 +65,7 @@ class Auth:
         )
 
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=self.ALGORITHM)
+            payload = self.signer.decode(token)
             if payload['scope'] == 'access_token':
                 email = payload['sub']
                 if email is None:
@@ -71,21 +75,26 @@ class Auth:
         except JWTError:
             raise credentials_exception
 
+        user = await user_cache.get(email)
+        if user is not None:
+            return user
         user = await repository_users.get_user_by_email(email, db)
         if user is None:
             raise credentials_exception
+        if not is_replica_session(db):
+            await user_cache.set(user)
         return user
 
     async def create_email_token(self, data: dict):
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(days=7)
         to_encode.update({'iat': datetime.utcnow(), 'exp': expire})
-        token = jwt.encode(to_encode, self.SECRET_KEY, self.ALGORITHM)
+        token = self.signer.encode(to_encode)
         return token
 
     async def get_email_from_token(self, token: str):
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=self.ALGORITHM)
+            payload = self.signer.decode(token)
             email = payload['sub']
             return email
         except JWTError as e:
@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, List
+
+import cloudinary
+import cloudinary.uploader
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from conf.config import settings
+
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def sniff_content_type(head: bytes) -> str | None:
+    """
+    Detects the image type from the first bytes of a file.
+
+    :param head: First bytes of the file.
+    :type head: bytes
+    :return: Content type, or None if the format is unknown.
+    :rtype: str | None
+    """
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def process_image(file: BinaryIO, size: int, quality: int, max_pixels: int) -> bytes:
+    """
+    Decodes an image, crops it to a centered square, resizes it and encodes it as WebP.
+
+    :param file: Image file.
+    :type file: BinaryIO
+    :param size: Width and height of the result, in pixels.
+    :type size: int
+    :param quality: WebP quality, 1-100.
+    :type quality: int
+    :param max_pixels: Largest accepted image area, checked before the pixels are decoded.
+    :type max_pixels: int
+    :return: Encoded WebP image.
+    :rtype: bytes
+    """
+    try:
+        with Image.open(file) as image:
+            if image.width * image.height > max_pixels:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                    detail=f'Avatar must not have more than {max_pixels} pixels')
+            # JPEG can be decoded at a reduced scale, which is much faster for large photos
+            image.draft('RGB', (size * 2, size * 2))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+            output = BytesIO()
+            image.save(output, 'WEBP', quality=quality, method=4)
+            return output.getvalue()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        print(e)
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail='Avatar image is invalid')
+
+
+class CloudinaryUploader:
+    """
+    Uploads avatars to Cloudinary. The client is configured once, when the uploader is created.
+    """
+
+    def __init__(self, cloud_name: str, api_key: str, api_secret: str):
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+
+    def upload(self, file: BinaryIO, public_id: str) -> str:
+        """
+        Uploads a file, blocking the calling thread.
+
+        :param file: Image file.
+        :type file: BinaryIO
+        :param public_id: Cloudinary public id, an existing image is overwritten.
+        :type public_id: str
+        :return: Avatar URL.
+        :rtype: str
+        """
+        r = cloudinary.uploader.upload(file, public_id=public_id, overwrite=True)
+        return r['secure_url']
+
+
+class FakeUploader:
+    """
+    In-process uploader for tests and local development, keeps uploaded files in memory.
+    """
+
+    def __init__(self):
+        self.files: dict[str, bytes] = {}
+
+    def upload(self, file: BinaryIO, public_id: str) -> str:
+        """
+        Stores a file.
+
+        :param file: Image file.
+        :type file: BinaryIO
+        :param public_id: Image id, an existing image is overwritten.
+        :type public_id: str
+        :return: Avatar URL.
+        :rtype: str
+        """
+        self.files[public_id] = file.read()
+        return f'memory://avatars/{public_id}.webp'
+
+
+class AvatarService:
+    """
+    Validates avatar uploads, resizes them locally and sends them to the uploader without blocking the event loop.
+
+    The upload is read in chunks into a spooled temporary file, so only small files are kept in memory, and is
+    rejected as soon as it exceeds ``max_size`` or its first bytes are not an allowed image format. The image is
+    then cropped to ``size`` x ``size`` WebP; if its hash matches the current avatar the upload is skipped. Processing
+    and the blocking upload run in a small thread pool and are abandoned with 504 after ``timeout`` seconds.
+    """
+
+    def __init__(self, uploader: CloudinaryUploader | FakeUploader, max_size: int, content_types: List[str],
+                 timeout: float, workers: int, size: int = 250, quality: int = 80, max_pixels: int = 40_000_000,
+                 chunk_size: int = 64 * 1024):
+        self.uploader = uploader
+        self.max_size = max_size
+        self.content_types = set(content_types)
+        self.timeout = timeout
+        self.size = size
+        self.quality = quality
+        self.max_pixels = max_pixels
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='avatar-upload')
+
+    def _check_content_type(self, content_type: str | None) -> None:
+        if content_type not in self.content_types:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                                detail=f'Avatar must be one of: {", ".join(sorted(self.content_types))}')
+
+    async def read(self, file: UploadFile) -> SpooledTemporaryFile:
+        """
+        Copies an uploaded file in chunks, checking its size and content type.
+
+        :param file: Uploaded file.
+        :type file: UploadFile
+        :return: Validated copy of the file, positioned at the start.
+        :rtype: SpooledTemporaryFile
+        """
+        self._check_content_type(file.content_type)
+        too_large = HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                  detail=f'Avatar must not be larger than {self.max_size} bytes')
+        if file.size is not None and file.size > self.max_size:
+            raise too_large
+        buffer = SpooledTemporaryFile(max_size=1024 * 1024)
+        size = 0
+        try:
+            while chunk := await file.read(self.chunk_size):
+                if size == 0:
+                    self._check_content_type(sniff_content_type(chunk))
+                size += len(chunk)
+                if size > self.max_size:
+                    raise too_large
+                buffer.write(chunk)
+            if size == 0:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Avatar file is empty')
+        except HTTPException:
+            buffer.close()
+            raise
+        buffer.seek(0)
+        return buffer
+
+    def _upload(self, buffer: SpooledTemporaryFile, public_id: str, current_hash: str | None) -> tuple[str, str] | None:
+        with buffer:
+            image = process_image(buffer, self.size, self.quality, self.max_pixels)
+        image_hash = hashlib.sha256(image).hexdigest()
+        if image_hash == current_hash:
+            return None
+        return self.uploader.upload(BytesIO(image), public_id), image_hash
+
+    async def upload(self, file: UploadFile, public_id: str, current_hash: str | None = None) -> tuple[str, str] | None:
+        """
+        Validates, resizes and uploads an avatar.
+
+        :param file: Uploaded file.
+        :type file: UploadFile
+        :param public_id: Image id.
+        :type public_id: str
+        :param current_hash: Hash of the current avatar, the upload is skipped if the new one is the same (OPTIONAL).
+        :type current_hash: str | None
+        :return: Avatar URL and hash, or None if the avatar did not change.
+        :rtype: tuple[str, str] | None
+        """
+        buffer = await self.read(file)
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self.executor, self._upload, buffer, public_id, current_hash), self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail='Avatar upload timed out')
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(e)
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail='Avatar upload failed')
+
+
+avatar_service = AvatarService(
+    CloudinaryUploader(settings.cloudinary_name, settings.cloudinary_api_key, settings.cloudinary_api_secret),
+    max_size=settings.avatar_max_size,
+    content_types=settings.avatar_content_types,
+    timeout=settings.avatar_upload_timeout,
+    workers=settings.avatar_upload_workers,
+    size=settings.avatar_size,
+    quality=settings.avatar_webp_quality,
+    max_pixels=settings.avatar_max_pixels,
+)
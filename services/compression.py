@@ -0,0 +1,122 @@
+import zlib
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """
+    Picks the response encoding from an ``Accept-Encoding`` header, brotli first.
+
+    :param accept_encoding: Header value.
+    :type accept_encoding: str
+    :return: ``br``, ``gzip`` or None for no compression.
+    :rtype: str | None
+    """
+    accepted = {}
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    wildcard = accepted.get('*', 0)
+    candidates = [(accepted.get(name, wildcard), -rank, name) for rank, name in enumerate(('br', 'gzip'))]
+    q, _, name = max(candidates)
+    return name if q > 0 else None
+
+
+class Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self._brotli:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON, NDJSON and text responses with brotli or gzip, as negotiated by ``Accept-Encoding``.
+
+    Single-message responses smaller than ``minimum_size`` are sent as they are; streamed responses are compressed
+    chunk by chunk. Strong ETags become weak, since the compressed bytes differ from the uncompressed ones.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor: Compressor | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+            if start is not None:
+                headers = MutableHeaders(raw=start['headers'])
+                body, more_body = message.get('body', b''), message.get('more_body', False)
+                skip = ('content-encoding' in headers
+                        or not headers.get('content-type', '').startswith(COMPRESSIBLE_TYPES)
+                        or (not more_body and len(body) < self.minimum_size))
+                if not skip:
+                    compressor = Compressor(encoding, self.gzip_level, self.brotli_quality)
+                    headers['Content-Encoding'] = encoding
+                    headers.add_vary_header('Accept-Encoding')
+                    etag = headers.get('etag')
+                    if etag and not etag.startswith('W/'):
+                        headers['ETag'] = f'W/{etag}'
+                    if more_body:
+                        del headers['Content-Length']
+                    else:
+                        message = {**message, 'body': compressor.compress(body) + compressor.finish()}
+                        headers['Content-Length'] = str(len(message['body']))
+                        compressor = None
+                await send(start)
+                start = None
+                if compressor is None:
+                    await send(message)
+                    return
+            if compressor is None:
+                await send(message)
+                return
+            body = compressor.compress(message.get('body', b''))
+            more_body = message.get('more_body', False)
+            if not more_body:
+                body += compressor.finish()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import Request, Response, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from conf.config import settings
+
+
+@dataclass
+class CacheEntry:
+    key: str | None
+    etag: str | None
+    response: Response | None = None
+
+
+class ContactsCache:
+    """
+    Cache of serialized contact read responses, invalidated by a per-user version counter.
+
+    Every write to a user's contacts increments the version. Responses are stored under the user, the version and
+    the request path with query, so a write makes all older entries unreachable and they simply expire. The ETag is
+    derived from the same values, which lets a poll with a matching ``If-None-Match`` get 304 after a single version
+    lookup. Without Redis the versions and responses are kept in this process only.
+    """
+
+    def __init__(self, ttl: int, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.redis: Redis | None = None
+        self._versions: dict[int, int] = {}
+        self._local: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def init(self, redis: Redis) -> None:
+        """
+        Switches the cache to Redis.
+
+        :param redis: Redis client created on application startup.
+        :type redis: Redis
+        :return: None.
+        :rtype: None
+        """
+        self.redis = redis
+
+    @staticmethod
+    def _version_key(user_id: int) -> str:
+        return f'contacts:ver:{user_id}'
+
+    async def version(self, user_id: int) -> int | None:
+        """
+        Gets the contacts version of a user.
+
+        :param user_id: User id.
+        :type user_id: int
+        :return: Version, or None if Redis is unreachable.
+        :rtype: int | None
+        """
+        if self.redis is None:
+            return self._versions.get(user_id, 0)
+        try:
+            return int(await self.redis.get(self._version_key(user_id)) or 0)
+        except RedisError as e:
+            print(e)
+            return None
+
+    async def bump(self, user_id: int) -> None:
+        """
+        Increments the contacts version of a user, called after every write to the user's contacts.
+
+        :param user_id: User id.
+        :type user_id: int
+        :return: None.
+        :rtype: None
+        """
+        if self.redis is None:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            return
+        try:
+            await self.redis.incr(self._version_key(user_id))
+        except RedisError as e:
+            print(e)
+
+    async def _get(self, key: str) -> str | None:
+        if self.redis is None:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return value
+        try:
+            return await self.redis.get(key)
+        except RedisError as e:
+            print(e)
+            return None
+
+    async def _set(self, key: str, value: str) -> None:
+        if self.redis is None:
+            self._local[key] = (time.monotonic() + self.ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+            return
+        try:
+            await self.redis.set(key, value, ex=self.ttl)
+        except RedisError as e:
+            print(e)
+
+    async def lookup(self, user_id: int, request: Request, cacheable: bool = True, variant: str = '') -> CacheEntry:
+        """
+        Looks up the response of a contacts read request.
+
+        A request that reads from a replica can still be answered from the cache, but its own response is neither
+        stored nor tagged: the replica may lag behind the write that produced the current version.
+
+        :param user_id: User id.
+        :type user_id: int
+        :param request: Current request.
+        :type request: Request
+        :param cacheable: Whether the response will be built from up-to-date rows, False for replica reads.
+        :type cacheable: bool
+        :param variant: Input of the response other than the contacts and the URL, e.g. the current date (OPTIONAL).
+        :type variant: str
+        :return: Entry with a 304 or cached response, or with the key and ETag to store the response under.
+        :rtype: CacheEntry
+        """
+        version = await self.version(user_id)
+        if version is None:
+            return CacheEntry(None, None)
+        digest = hashlib.sha1(f'{request.url.path}?{request.url.query}#{variant}'.encode()).hexdigest()
+        etag = f'"{user_id}-{version}-{digest[:16]}"'
+        key = f'contacts:resp:{user_id}:{version}:{digest}'
+        entry = CacheEntry(key, etag) if cacheable else CacheEntry(None, None)
+        if etag in {tag.strip().removeprefix('W/') for tag in request.headers.get('if-none-match', '').split(',')}:
+            entry.response = Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=self._headers(etag))
+            return entry
+        cached = await self._get(key)
+        if cached is not None:
+            data = json.loads(cached)
+            entry.response = Response(data['body'], media_type='application/json',
+                                      headers={**data['headers'], **self._headers(etag)})
+        return entry
+
+    async def store(self, entry: CacheEntry, body: bytes, headers: dict | None = None) -> Response:
+        """
+        Caches a serialized response and builds the response with the ETag.
+
+        :param entry: Entry returned by :meth:`lookup`.
+        :type entry: CacheEntry
+        :param body: JSON response body.
+        :type body: bytes
+        :param headers: Additional response headers (OPTIONAL).
+        :type headers: dict | None
+        :return: Response.
+        :rtype: Response
+        """
+        headers = headers or {}
+        if entry.key is None:
+            return Response(body, media_type='application/json', headers=headers)
+        await self._set(entry.key, json.dumps({'body': body.decode(), 'headers': headers}))
+        return Response(body, media_type='application/json', headers={**headers, **self._headers(entry.etag)})
+
+    @staticmethod
+    def _headers(etag: str) -> dict:
+        return {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    def clear(self) -> None:
+        """
+        Drops the in-process versions and responses.
+
+        :return: None.
+        :rtype: None
+        """
+        self._versions.clear()
+        self._local.clear()
+
+
+contacts_cache = ContactsCache(settings.contacts_cache_ttl, settings.contacts_cache_maxsize)
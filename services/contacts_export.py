@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+EXPORT_FIELDS = ('id', 'name', 'lastname', 'email', 'phone_number', 'birthday')
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+async def iter_ndjson(rows: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """
+    Formats contact rows as newline delimited JSON.
+
+    :param rows: Contact rows.
+    :type rows: AsyncIterator[dict]
+    :return: One JSON object per line.
+    :rtype: AsyncIterator[str]
+    """
+    async for row in rows:
+        yield json.dumps({field: row[field] for field in EXPORT_FIELDS}, default=str) + '\n'
+
+
+async def iter_csv(rows: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """
+    Formats contact rows as CSV with a header row.
+
+    :param rows: Contact rows.
+    :type rows: AsyncIterator[dict]
+    :return: CSV lines.
+    :rtype: AsyncIterator[str]
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(EXPORT_FIELDS)
+    async for row in rows:
+        writer.writerow([row[field] for field in EXPORT_FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_contacts(rows: AsyncIterator[dict], export_format: str) -> AsyncIterator[str]:
+    """
+    Picks the formatter for the requested export format.
+
+    :param rows: Contact rows.
+    :type rows: AsyncIterator[dict]
+    :param export_format: ``ndjson`` or ``csv``.
+    :type export_format: str
+    :return: Formatted body chunks.
+    :rtype: AsyncIterator[str]
+    """
+    if export_format == 'csv':
+        return iter_csv(rows)
+    return iter_ndjson(rows)
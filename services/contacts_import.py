@@ -0,0 +1,182 @@
+import csv
+import json
+from typing import AsyncIterator, AsyncIterable, List, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import User
+from repository import contacts as repository_contacts
+from schemas import ContactModel
+
+CSV_TYPES = ('text/csv',)
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Splits a stream of byte chunks into decoded lines without reading the whole body.
+
+    :param chunks: Request body stream.
+    :type chunks: AsyncIterable[bytes]
+    :return: Lines without line terminators.
+    :rtype: AsyncIterator[str]
+    """
+    tail = b''
+    async for chunk in chunks:
+        tail += chunk
+        *lines, tail = tail.split(b'\n')
+        for line in lines:
+            yield line.rstrip(b'\r').decode('utf-8-sig')
+    if tail:
+        yield tail.rstrip(b'\r').decode('utf-8-sig')
+
+
+class _NeedMoreLines(Exception):
+    pass
+
+
+def _pending_lines(lines: List[str]):
+    yield from lines
+    raise _NeedMoreLines
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[dict | str]:
+    """
+    Parses CSV lines with a header row, quoted fields may span several lines.
+
+    Lines are buffered only while a quoted field is open, the ``csv`` module decides where a record ends. A record
+    the ``csv`` module rejects is reported as an error message and parsing goes on with the next line.
+
+    :param lines: Decoded lines.
+    :type lines: AsyncIterator[str]
+    :return: Records keyed by the header columns, or an error message for a malformed record.
+    :rtype: AsyncIterator[dict | str]
+    """
+    header, pending = None, []
+    async for line in lines:
+        if not pending and not line.strip():
+            continue
+        pending.append(line + '\n')
+        try:
+            values = next(csv.reader(_pending_lines(pending)))
+        except _NeedMoreLines:
+            continue
+        except csv.Error as e:
+            values = f'Malformed CSV row: {e}'
+        pending = []
+        if header is None:
+            if isinstance(values, str):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Malformed CSV header')
+            header = [value.strip() for value in values]
+        else:
+            yield values if isinstance(values, str) else dict(zip(header, values))
+    if pending and header is not None:
+        try:
+            yield dict(zip(header, next(csv.reader(pending, strict=True))))
+        except csv.Error as e:
+            yield f'Malformed CSV row: {e}'
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[dict | None]:
+    """
+    Parses newline delimited JSON, one object per line.
+
+    :param lines: Decoded lines.
+    :type lines: AsyncIterator[str]
+    :return: Records, or None for a line that is not a JSON object.
+    :rtype: AsyncIterator[dict | None]
+    """
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record if isinstance(record, dict) else None
+
+
+def get_record_parser(content_type: str | None):
+    """
+    Picks the record parser for the upload content type.
+
+    :param content_type: Value of the Content-Type header.
+    :type content_type: str | None
+    :return: Record parser.
+    :rtype: Callable
+    """
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    if media_type in CSV_TYPES:
+        return iter_csv_records
+    if media_type in NDJSON_TYPES:
+        return iter_ndjson_records
+    raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                        detail='Upload text/csv or application/x-ndjson')
+
+
+def validate_records(records: List[Tuple[int, dict | str | None]]) -> Tuple[List[ContactModel], List[dict]]:
+    """
+    Validates a chunk of records with ContactModel.
+
+    :param records: Pairs of row number and parsed record, or the parser's error message for the row.
+    :type records: List[Tuple[int, dict | str | None]]
+    :return: Valid contacts and error reports of invalid rows.
+    :rtype: Tuple[List[ContactModel], List[dict]]
+    """
+    contacts, errors = [], []
+    for row, record in records:
+        if record is None:
+            errors.append({'row': row, 'errors': ['Row is not a JSON object']})
+            continue
+        if isinstance(record, str):
+            errors.append({'row': row, 'errors': [record]})
+            continue
+        try:
+            contacts.append(ContactModel.model_validate(record))
+        except ValidationError as e:
+            errors.append({'row': row, 'errors': [f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()]})
+    return contacts, errors
+
+
+async def import_contacts(chunks: AsyncIterable[bytes], content_type: str | None, user: User, db: AsyncSession,
+                          batch_size: int) -> dict:
+    """
+    Imports contacts from a streamed CSV or NDJSON upload.
+
+    Rows are validated and inserted in chunks of ``batch_size``, each chunk in its own transaction.
+
+    :param chunks: Request body stream.
+    :type chunks: AsyncIterable[bytes]
+    :param content_type: Value of the Content-Type header.
+    :type content_type: str | None
+    :param user: User for which contacts will create.
+    :type user: User
+    :param db: Database session.
+    :type db: AsyncSession
+    :param batch_size: Number of rows per validation chunk and transaction.
+    :type batch_size: int
+    :return: Number of imported rows and error reports of rejected rows.
+    :rtype: dict
+    """
+    parse_records = get_record_parser(content_type)
+    imported, errors, batch, row = 0, [], [], 0
+
+    async def flush():
+        nonlocal imported
+        contacts, batch_errors = validate_records(batch)
+        imported += await repository_contacts.create_contacts(contacts, user, db)
+        errors.extend(batch_errors)
+        batch.clear()
+
+    try:
+        async for record in parse_records(iter_lines(chunks)):
+            row += 1
+            batch.append((row, record))
+            if len(batch) >= batch_size:
+                await flush()
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Upload must be UTF-8 encoded')
+    await flush()
+    return {'imported': imported, 'failed': len(errors), 'errors': errors}
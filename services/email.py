@@ -1,36 +1,36 @@
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
-from conf.config import settings
-from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repository import emails as repository_emails
 from services.auth import auth_service
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME='RestAPI',
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
 
-async def send_email(email: EmailStr, username: str, host: str):
-    try:
-        token_verification = await auth_service.create_email_token({'sub': email})
-        message = MessageSchema(
-            subject='Confirm your email',
-            recipients=[email],
-            template_body={'host': host, 'username': username, 'token': token_verification},
-            subtype=MessageType.html,
-        )
+async def send_email(email: EmailStr, username: str, host: str, db: AsyncSession, commit: bool = True):
+    """
+    Queues the email confirmation message in the outbox, it is delivered by ``services.email_worker``.
 
-        fm = FastMail(conf)
+    Repeated requests while a confirmation email is still pending do not queue another one.
 
-        await fm.send_message(message, template_name='email_template.html')
-    except ConnectionErrors as e:
-        print(e)
+    :param email: Email address of the user.
+    :type email: EmailStr
+    :param username: Username.
+    :type username: str
+    :param host: Base URL of the service, used in the confirmation link.
+    :type host: str
+    :param db: Database session.
+    :type db: AsyncSession
+    :param commit: Commit right away, False queues the email in the caller's transaction.
+    :type commit: bool
+    :return: None.
+    :rtype: None
+    """
+    token_verification = await auth_service.create_email_token({'sub': email})
+    await repository_emails.enqueue_email(
+        recipient=email,
+        subject='Confirm your email',
+        template='email_template.html',
+        context={'host': str(host), 'username': username, 'token': token_verification},
+        db=db,
+        dedupe_key=f'confirm:{email}',
+        commit=commit,
+    )
@@ -0,0 +1,105 @@
+import re
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader, Template, meta, nodes, select_autoescape
+from markupsafe import escape
+
+TEMPLATE_FOLDER = Path(__file__).parent / 'templates'
+_MARKER = '\x00{}\x00'
+_MARKER_RE = re.compile('\x00([A-Za-z_][A-Za-z0-9_]*)\x00')
+
+
+class CompiledTemplate:
+    """
+    Template split into static text and per-recipient fields.
+
+    The template is rendered once with a marker in place of every variable, the output is split on the markers,
+    and rendering afterwards only escapes the field values and joins them with the static parts. Templates that
+    do more with a variable than print it (filters, conditions, loops, attribute access) or that pull in other
+    templates cannot be split this way and are rendered by Jinja.
+    """
+
+    def __init__(self, template: Template, source: nodes.Template, autoescape: bool):
+        self.template = template
+        self.autoescape = autoescape
+        self.parts: list[str] | None = None
+        if self._is_splittable(source):
+            fields = meta.find_undeclared_variables(source)
+            self.parts = _MARKER_RE.split(template.render({field: _MARKER.format(field) for field in fields}))
+
+    @staticmethod
+    def _is_splittable(source: nodes.Template) -> bool:
+        if any(source.find_all((nodes.Extends, nodes.Include, nodes.Import, nodes.FromImport))):
+            return False
+        printed = sum(isinstance(node, nodes.Name) for output in source.find_all(nodes.Output) for node in output.nodes)
+        return printed == sum(1 for _ in source.find_all(nodes.Name))
+
+    def render(self, context: dict) -> str:
+        """
+        Renders the template for one recipient.
+
+        :param context: Template variables.
+        :type context: dict
+        :return: Rendered text.
+        :rtype: str
+        """
+        if self.parts is None:
+            return self.template.render(context)
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            value = context.get(parts[i], '')
+            parts[i] = str(escape(value)) if self.autoescape else str(value)
+        return ''.join(parts)
+
+
+class TemplateRenderer:
+    """
+    Compiles email templates once and keeps them for the life of the process.
+    """
+
+    def __init__(self, folder: Path = TEMPLATE_FOLDER):
+        self.folder = folder
+        self.env = Environment(loader=FileSystemLoader(folder), autoescape=select_autoescape(['html']))
+        self._compiled: dict[str, CompiledTemplate] = {}
+
+    def compile(self, name: str) -> CompiledTemplate:
+        """
+        Gets a compiled template, compiling it on first use.
+
+        :param name: Template file name.
+        :type name: str
+        :return: Compiled template.
+        :rtype: CompiledTemplate
+        """
+        compiled = self._compiled.get(name)
+        if compiled is None:
+            source = self.env.parse(self.env.loader.get_source(self.env, name)[0])
+            compiled = CompiledTemplate(self.env.get_template(name), source, self.env.autoescape(name))
+            self._compiled[name] = compiled
+        return compiled
+
+    def preload(self) -> None:
+        """
+        Compiles every template of the folder, called on worker startup.
+
+        :return: None.
+        :rtype: None
+        """
+        for name in self.env.list_templates():
+            self.compile(name)
+
+    def render(self, name: str, context: dict) -> str:
+        """
+        Renders a template.
+
+        :param name: Template file name.
+        :type name: str
+        :param context: Template variables.
+        :type context: dict
+        :return: Rendered text.
+        :rtype: str
+        """
+        return self.compile(name).render(context)
+
+
+email_templates = TemplateRenderer()
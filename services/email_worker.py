@@ -0,0 +1,167 @@
+"""
+Outbox email worker, run it next to the API::
+
+    python -m services.email_worker
+"""
+import asyncio
+import json
+from email.message import EmailMessage as MIMEMessage
+from email.utils import formataddr
+from typing import Callable
+
+from aiosmtplib import SMTP
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from conf.config import settings
+from db.models import EmailMessage
+from repository import emails as repository_emails
+from services.email_templates import TemplateRenderer, email_templates
+
+MAIL_FROM_NAME = 'RestAPI'
+
+
+def smtp_factory() -> SMTP:
+    """
+    Creates an SMTP client for the configured mail server.
+
+    :return: Unconnected SMTP client, it logs in on connect.
+    :rtype: SMTP
+    """
+    return SMTP(hostname=settings.mail_server, port=settings.mail_port, use_tls=True,
+                username=settings.mail_username, password=settings.mail_password)
+
+
+class SMTPPool:
+    """
+    Keeps up to ``size`` SMTP connections open and reuses them across messages and batches.
+    """
+
+    def __init__(self, size: int, factory: Callable[[], SMTP] = smtp_factory):
+        self.size = size
+        self.factory = factory
+        self.connections_opened = 0
+        self._idle: list[SMTP] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def send(self, message: MIMEMessage) -> None:
+        """
+        Sends a message over an idle connection, opening a new one if needed.
+
+        A connection that failed is dropped instead of being returned to the pool.
+
+        :param message: Message to send.
+        :type message: MIMEMessage
+        :return: None.
+        :rtype: None
+        """
+        async with self._slots:
+            smtp = self._idle.pop() if self._idle else None
+            if smtp is None or not smtp.is_connected:
+                smtp = self.factory()
+                await smtp.connect()
+                self.connections_opened += 1
+            try:
+                await smtp.send_message(message)
+            except Exception:
+                smtp.close()
+                raise
+            self._idle.append(smtp)
+
+    async def close(self) -> None:
+        """
+        Closes all idle connections.
+
+        :return: None.
+        :rtype: None
+        """
+        while self._idle:
+            smtp = self._idle.pop()
+            try:
+                await smtp.quit()
+            except Exception as e:
+                print(e)
+                smtp.close()
+
+
+class EmailWorker:
+    """
+    Delivers outbox emails in batches and retries failed ones with exponential backoff.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, pool: SMTPPool, batch_size: int, max_attempts: int,
+                 backoff: float, max_backoff: float, templates: TemplateRenderer = email_templates):
+        self.session_factory = session_factory
+        self.pool = pool
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.templates = templates
+
+    def build_message(self, email: EmailMessage) -> MIMEMessage:
+        """
+        Renders an outbox email into a MIME message.
+
+        :param email: Outbox email.
+        :type email: EmailMessage
+        :return: MIME message.
+        :rtype: MIMEMessage
+        """
+        message = MIMEMessage()
+        message['From'] = formataddr((MAIL_FROM_NAME, settings.mail_from))
+        message['To'] = email.recipient
+        message['Subject'] = email.subject
+        message.set_content(self.templates.render(email.template, json.loads(email.context)), subtype='html')
+        return message
+
+    async def _send(self, email: EmailMessage) -> None:
+        await self.pool.send(self.build_message(email))
+
+    async def run_once(self) -> int:
+        """
+        Sends one batch of due emails.
+
+        :return: Number of processed emails.
+        :rtype: int
+        """
+        async with self.session_factory() as db:
+            emails = await repository_emails.get_due_emails(self.batch_size, db)
+            results = await asyncio.gather(*(self._send(email) for email in emails), return_exceptions=True)
+            for email, result in zip(emails, results):
+                if isinstance(result, Exception):
+                    print(result)
+                    repository_emails.mark_failed(email, repr(result), self.max_attempts, self.backoff, self.max_backoff)
+                else:
+                    repository_emails.mark_sent(email)
+            await db.commit()
+            return len(emails)
+
+    async def run_forever(self, poll_interval: float) -> None:
+        """
+        Processes batches until cancelled, sleeping when the outbox has nothing due.
+
+        :param poll_interval: Sleep time between polls of an empty outbox, in seconds.
+        :type poll_interval: float
+        :return: None.
+        :rtype: None
+        """
+        try:
+            while True:
+                if await self.run_once() < self.batch_size:
+                    await asyncio.sleep(poll_interval)
+        finally:
+            await self.pool.close()
+
+
+async def main():
+    from db.connect_db import AsyncSessionLocal
+
+    email_templates.preload()
+    worker = EmailWorker(AsyncSessionLocal, SMTPPool(settings.email_smtp_pool_size),
+                         batch_size=settings.email_batch_size, max_attempts=settings.email_max_attempts,
+                         backoff=settings.email_retry_backoff, max_backoff=settings.email_retry_max_backoff)
+    await worker.run_forever(settings.email_poll_interval)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
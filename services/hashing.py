@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
+
+
+class HashingPool:
+    """
+    Bounded thread pool for CPU-heavy password hashing.
+
+    bcrypt releases the GIL, so hashing in threads keeps the event loop responsive. Requests beyond
+    ``workers + queue_limit`` are rejected with 503 right away instead of waiting in an unbounded queue.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.capacity = workers + queue_limit
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _call(self, func: Callable, *args) -> Any:
+        with self._lock:
+            self.running += 1
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.busy_seconds += time.perf_counter() - start
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Runs ``func(*args)`` in the pool.
+
+        :param func: Blocking function to call.
+        :type func: Callable
+        :param args: Arguments of the function.
+        :return: Result of the function.
+        :rtype: Any
+        """
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail='Too many authentication requests, try again later',
+                                headers={'Retry-After': '1'})
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self._call, func, *args)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """
+        Gets pool metrics.
+
+        :return: Worker count, running and queued calls, completed and rejected totals, busy time.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'capacity': self.capacity,
+                'running': self.running,
+                'queued': max(self.in_flight - self.running, 0),
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'busy_seconds': self.busy_seconds,
+            }
@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from typing import Dict
+
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+from jose.constants import ALGORITHMS
+
+from conf.config import Settings
+
+
+class JWTSigner:
+    """
+    Signs and verifies JWTs with key objects that are parsed once, at startup.
+
+    Symmetric (HS*) algorithms use the shared secret. Asymmetric (ES*, RS*) algorithms sign with the private key
+    and verify with public keys looked up by the ``kid`` header, so services that only verify tokens need no
+    secret, and keys can be rotated by publishing the new public key before switching ``key_id``.
+
+    Recently verified tokens are kept in a bounded LRU cache until they expire, so repeated requests with the
+    same token skip signature verification.
+    """
+
+    def __init__(self, algorithm: str, secret_key: str | None = None, private_key: str | None = None,
+                 public_keys: Dict[str, str] | None = None, key_id: str | None = None, cache_size: int = 1024):
+        if algorithm not in ALGORITHMS.SUPPORTED:
+            raise ValueError(f'Unsupported JWT algorithm: {algorithm}')
+        self.algorithm = algorithm
+        self.key_id = key_id
+        self.cache_size = cache_size
+        self._verified: OrderedDict[str, dict] = OrderedDict()
+
+        if algorithm in ALGORITHMS.HMAC:
+            self.signing_key: Key | None = jwk.construct(secret_key, algorithm)
+            self.verify_keys: Dict[str | None, Key] = {key_id: self.signing_key}
+        else:
+            self.signing_key = jwk.construct(private_key, algorithm) if private_key else None
+            self.verify_keys = {kid: jwk.construct(pem, algorithm) for kid, pem in (public_keys or {}).items()}
+            if self.signing_key is not None and key_id not in self.verify_keys:
+                self.verify_keys[key_id] = self.signing_key.public_key()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> 'JWTSigner':
+        """
+        Builds a signer from application settings.
+
+        :param settings: Application settings.
+        :type settings: Settings
+        :return: Signer.
+        :rtype: JWTSigner
+        """
+        return cls(settings.algorithm, secret_key=settings.secret_key, private_key=settings.jwt_private_key,
+                   public_keys=settings.jwt_public_keys, key_id=settings.jwt_key_id,
+                   cache_size=settings.jwt_decode_cache_size)
+
+    def encode(self, claims: dict) -> str:
+        """
+        Signs claims with the current key.
+
+        :param claims: Token claims.
+        :type claims: dict
+        :return: Encoded token.
+        :rtype: str
+        """
+        if self.signing_key is None:
+            raise JWTError('No signing key configured')
+        headers = {'kid': self.key_id} if self.key_id else None
+        return jwt.encode(claims, self.signing_key, algorithm=self.algorithm, headers=headers)
+
+    def decode(self, token: str) -> dict:
+        """
+        Verifies a token and returns its claims.
+
+        :param token: Encoded token.
+        :type token: str
+        :return: Token claims.
+        :rtype: dict
+        """
+        payload = self._verified.get(token)
+        if payload is not None:
+            if payload.get('exp', float('inf')) > time.time():
+                self._verified.move_to_end(token)
+                return dict(payload)
+            del self._verified[token]
+
+        kid = jwt.get_unverified_header(token).get('kid')
+        key = self.verify_keys.get(kid)
+        if key is None and kid is None and len(self.verify_keys) == 1:
+            key = next(iter(self.verify_keys.values()))
+        if key is None:
+            raise JWTError('Unknown key id')
+        payload = jwt.decode(token, key, algorithms=[self.algorithm])
+
+        if self.cache_size:
+            self._verified[token] = payload
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return dict(payload)
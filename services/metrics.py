@@ -0,0 +1,284 @@
+import asyncio
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from conf.config import settings
+from db.connect_db import get_pool_stats
+from db.query_stats import QueryStats, start_request
+from services.auth import auth_service
+from services.rate_limit import rate_limits
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, float('inf'))
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, float('inf'))
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.bounds = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterable[tuple[str, int]]:
+        total = 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            yield '+Inf' if bound == float('inf') else f'{bound:g}', total
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class MetricsRegistry:
+    """
+    Request metrics of this process, rendered in the Prometheus text format.
+
+    Requests are labelled with the route template (``/api/contacts/{contact_id}``) rather than the path, so the
+    number of series stays bounded; requests that match no route share one label.
+    """
+
+    def __init__(self):
+        self.redis: Redis | None = None
+        self.in_progress: dict[str, int] = defaultdict(int)
+        self.requests: dict[tuple[str, str, int], int] = defaultdict(int)
+        self.latency: dict[tuple[str, str], Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.request_size: dict[tuple[str, str], Histogram] = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.response_size: dict[tuple[str, str], Histogram] = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.queries: dict[tuple[str, str], Histogram] = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.db_time: dict[tuple[str, str], Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.repeated_queries: dict[tuple[str, str], int] = defaultdict(int)
+
+    def init(self, redis: Redis) -> None:
+        """
+        Enables Redis metrics.
+
+        :param redis: Redis client created on application startup.
+        :type redis: Redis
+        :return: None.
+        :rtype: None
+        """
+        self.redis = redis
+
+    def observe(self, method: str, route: str, status: int, seconds: float, request_size: int,
+                response_size: int) -> None:
+        """
+        Records a finished request.
+
+        :param method: HTTP method.
+        :type method: str
+        :param route: Route template.
+        :type route: str
+        :param status: Response status code.
+        :type status: int
+        :param seconds: Time until the response was sent.
+        :type seconds: float
+        :param request_size: Request body size in bytes.
+        :type request_size: int
+        :param response_size: Response body size in bytes, as sent.
+        :type response_size: int
+        :return: None.
+        :rtype: None
+        """
+        self.requests[method, route, status] += 1
+        self.latency[method, route].observe(seconds)
+        self.request_size[method, route].observe(request_size)
+        self.response_size[method, route].observe(response_size)
+
+    def observe_queries(self, method: str, route: str, stats: QueryStats, repeat_threshold: int) -> None:
+        """
+        Records the database queries of a finished request.
+
+        :param method: HTTP method.
+        :type method: str
+        :param route: Route template.
+        :type route: str
+        :param stats: Queries of the request.
+        :type stats: QueryStats
+        :param repeat_threshold: Executions of one statement that count as an N+1 pattern.
+        :type repeat_threshold: int
+        :return: None.
+        :rtype: None
+        """
+        self.queries[method, route].observe(stats.count)
+        self.db_time[method, route].observe(stats.seconds)
+        if stats.repeated(repeat_threshold):
+            self.repeated_queries[method, route] += 1
+
+    @staticmethod
+    def _histogram(lines: list, name: str, help_text: str, series: dict, label_names: tuple) -> None:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for key, histogram in sorted(series.items()):
+            labels = dict(zip(label_names, key))
+            for le, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{_labels(**labels, le=le)} {count}')
+            lines.append(f'{name}_sum{_labels(**labels)} {histogram.sum}')
+            lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+
+    @staticmethod
+    def _gauges(lines: list, name: str, kind: str, help_text: str, samples: Iterable[tuple[dict, float]]) -> None:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{_labels(**labels) if labels else ""} {value}' for labels, value in samples]
+
+    async def _redis_samples(self) -> tuple[int, dict]:
+        try:
+            await asyncio.wait_for(self.redis.ping(), 0.5)
+            up = 1
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            print(e)
+            up = 0
+        pool = self.redis.connection_pool
+        return up, {
+            'created': getattr(pool, '_created_connections', 0),
+            'in_use': len(getattr(pool, '_in_use_connections', ())),
+            'available': len(getattr(pool, '_available_connections', ())),
+        }
+
+    async def render(self) -> str:
+        """
+        Renders request, connection pool, password hashing, rate limiter and Redis metrics.
+
+        :return: Prometheus text exposition.
+        :rtype: str
+        """
+        lines = []
+        self._gauges(lines, 'http_requests_in_progress', 'gauge', 'Requests being processed.',
+                     (({'method': method}, count) for method, count in sorted(self.in_progress.items())))
+        self._gauges(lines, 'http_requests_total', 'counter', 'Finished requests.',
+                     (({'method': method, 'route': route, 'status': status}, count)
+                      for (method, route, status), count in sorted(self.requests.items())))
+        self._histogram(lines, 'http_request_duration_seconds', 'Time until the response was sent.',
+                        self.latency, ('method', 'route'))
+        self._histogram(lines, 'http_request_size_bytes', 'Request body size.', self.request_size,
+                        ('method', 'route'))
+        self._histogram(lines, 'http_response_size_bytes', 'Response body size as sent, after compression.',
+                        self.response_size, ('method', 'route'))
+        self._histogram(lines, 'http_request_db_queries', 'Database queries per request.', self.queries,
+                        ('method', 'route'))
+        self._histogram(lines, 'http_request_db_seconds', 'Database time per request.', self.db_time,
+                        ('method', 'route'))
+        self._gauges(lines, 'http_requests_repeated_queries_total', 'counter',
+                     'Requests that executed one statement query_repeat_threshold times or more.',
+                     (({'method': method, 'route': route}, count)
+                      for (method, route), count in sorted(self.repeated_queries.items())))
+
+        pools = get_pool_stats()
+        for field, kind, help_text in (('size', 'gauge', 'Configured pool size.'),
+                                       ('checked_out', 'gauge', 'Connections in use.'),
+                                       ('checked_in', 'gauge', 'Idle connections.'),
+                                       ('overflow', 'gauge', 'Connections above the pool size.'),
+                                       ('timeouts', 'counter', 'Checkouts that timed out.')):
+            name = f'db_pool_{field}_total' if kind == 'counter' else f'db_pool_{field}'
+            self._gauges(lines, name, kind, help_text, (({'pool': pool['name']}, pool[field]) for pool in pools))
+        lines += ['# HELP db_pool_wait_seconds Time spent waiting for a connection.',
+                  '# TYPE db_pool_wait_seconds histogram']
+        for pool in pools:
+            wait = pool['wait_seconds']
+            for le, count in wait['buckets'].items():
+                lines.append(f'db_pool_wait_seconds_bucket{_labels(pool=pool["name"], le=le)} {count}')
+            lines.append(f'db_pool_wait_seconds_sum{_labels(pool=pool["name"])} {wait["sum"]}')
+            lines.append(f'db_pool_wait_seconds_count{_labels(pool=pool["name"])} {wait["count"]}')
+
+        hashing = auth_service.hashing_pool.stats()
+        for field, kind in (('running', 'gauge'), ('queued', 'gauge'), ('completed', 'counter'),
+                            ('rejected', 'counter'), ('busy_seconds', 'counter')):
+            name = f'password_hash_{field}_total' if kind == 'counter' else f'password_hash_{field}'
+            self._gauges(lines, name, kind, f'Password hashing pool {field.replace("_", " ")}.',
+                         [({}, hashing[field])])
+
+        limits = rate_limits.stats()
+        for field, kind in (('buckets', 'gauge'), ('allowed', 'counter'), ('denied', 'counter'),
+                            ('syncs', 'counter'), ('sync_errors', 'counter'), ('degraded', 'gauge')):
+            name = f'rate_limit_{field}_total' if kind == 'counter' else f'rate_limit_{field}'
+            self._gauges(lines, name, kind, f'Rate limiter {field.replace("_", " ")}.', [({}, int(limits[field]))])
+
+        if self.redis is not None:
+            up, connections = await self._redis_samples()
+            self._gauges(lines, 'redis_up', 'gauge', 'Whether Redis answered a ping.', [({}, up)])
+            self._gauges(lines, 'redis_connections', 'gauge', 'Redis client connections.',
+                         (({'state': state}, count) for state, count in connections.items()))
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    Records latency, in-flight count, status code, body sizes and database queries of every HTTP request.
+
+    With ``query_debug`` the query count and time are also sent in ``X-DB-Query-Count`` and ``X-DB-Query-Time``
+    response headers and every request prints a line with its slowest and repeated statements.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = metrics, query_debug: bool = settings.query_debug,
+                 repeat_threshold: int = settings.query_repeat_threshold):
+        self.app = app
+        self.registry = registry
+        self.query_debug = query_debug
+        self.repeat_threshold = repeat_threshold
+        self._routes: dict | None = None
+
+    def _route(self, scope: Scope) -> str:
+        if self._routes is None:
+            self._routes = {}
+            for route in scope['app'].routes:
+                if getattr(route, 'endpoint', None) is not None:
+                    self._routes.setdefault(route.endpoint, route.path)
+        return self._routes.get(scope.get('endpoint'), UNMATCHED_ROUTE)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        method = scope['method']
+        start = time.perf_counter()
+        status, request_size, response_size = 500, 0, 0
+        queries = start_request()
+
+        async def receive_counted() -> Message:
+            nonlocal request_size
+            message = await receive()
+            request_size += len(message.get('body', b''))
+            return message
+
+        async def send_counted(message: Message) -> None:
+            nonlocal status, response_size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if self.query_debug:
+                    headers = MutableHeaders(scope=message)
+                    headers['X-DB-Query-Count'] = str(queries.count)
+                    headers['X-DB-Query-Time'] = f'{queries.seconds * 1000:.1f}ms'
+            elif message['type'] == 'http.response.body':
+                response_size += len(message.get('body', b''))
+            await send(message)
+
+        self.registry.in_progress[method] += 1
+        try:
+            await self.app(scope, receive_counted, send_counted)
+        finally:
+            self.registry.in_progress[method] -= 1
+            route = self._route(scope)
+            self.registry.observe(method, route, status, time.perf_counter() - start, request_size, response_size)
+            self.registry.observe_queries(method, route, queries, self.repeat_threshold)
+            if self.query_debug:
+                print(f'{method} {scope["path"]} {status}: {queries.report()}')
@@ -0,0 +1,56 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_SIZE = 100
+
+SORT_KEYS = {
+    'id': ('id',),
+    'lastname': ('lastname', 'id'),
+}
+KEY_TYPES = {
+    'id': int,
+    'lastname': str,
+}
+
+
+def encode_cursor(order_by: str, item) -> str:
+    """
+    Builds an opaque cursor pointing right after the given item.
+
+    :param order_by: Sort key the page was built with.
+    :type order_by: str
+    :param item: Last item of the page.
+    :type item: Contact
+    :return: URL-safe cursor.
+    :rtype: str
+    """
+    data = {'o': order_by, 'k': [getattr(item, key) for key in SORT_KEYS[order_by]]}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(order_by: str, cursor: str | None) -> tuple | None:
+    """
+    Decodes a cursor produced by :func:`encode_cursor`.
+
+    :param order_by: Sort key of the current request.
+    :type order_by: str
+    :param cursor: Cursor from the previous page (OPTIONAL).
+    :type cursor: str | None
+    :return: Key values of the last seen item, or None for the first page.
+    :rtype: tuple | None
+    """
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        keys = tuple(data['k'])
+        if data['o'] != order_by or len(keys) != len(SORT_KEYS[order_by]):
+            raise ValueError(cursor)
+        for key, value in zip(SORT_KEYS[order_by], keys):
+            if type(value) is not KEY_TYPES[key]:
+                raise TypeError(value)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid cursor')
+    return keys
@@ -0,0 +1,61 @@
+from typing import Any, Tuple
+
+import orjson
+from fastapi import HTTPException, status
+
+from schemas import ContactResponse
+
+CONTACT_FIELDS = tuple(ContactResponse.model_fields)
+
+
+def parse_fields(fields: str | None) -> Tuple[str, ...] | None:
+    """
+    Parses a comma separated ``fields`` query parameter.
+
+    :param fields: Requested contact fields, e.g. ``name,lastname`` (OPTIONAL).
+    :type fields: str | None
+    :return: Requested fields in response order with ``id`` always included, or None for all fields.
+    :rtype: Tuple[str, ...] | None
+    """
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(',') if field.strip()}
+    unknown = requested - set(CONTACT_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(field for field in CONTACT_FIELDS if field in requested or field == 'id')
+
+
+def to_dict(contact: Any, fields: Tuple[str, ...] | None = None) -> dict:
+    """
+    Reads the response fields of a contact without validating them.
+
+    :param contact: Contact.
+    :type contact: Contact
+    :param fields: Fields to keep, all fields if None (OPTIONAL).
+    :type fields: Tuple[str, ...] | None
+    :return: Field values.
+    :rtype: dict
+    """
+    return {field: getattr(contact, field) for field in fields or CONTACT_FIELDS}
+
+
+def serialize(contacts: Any, fields: Tuple[str, ...] | None = None) -> bytes:
+    """
+    Serializes a contact or a list of contacts straight to JSON bytes.
+
+    Values were validated when they were written, so the rows are not validated again; this is the response
+    path for large lists. The output has the same shape as ``ContactResponse``.
+
+    :param contacts: Contact or list of contacts.
+    :type contacts: Contact | List[Contact]
+    :param fields: Fields to keep, all fields if None (OPTIONAL).
+    :type fields: Tuple[str, ...] | None
+    :return: JSON document.
+    :rtype: bytes
+    """
+    fields = fields or CONTACT_FIELDS
+    if isinstance(contacts, list):
+        return orjson.dumps([to_dict(contact, fields) for contact in contacts])
+    return orjson.dumps(to_dict(contacts, fields))
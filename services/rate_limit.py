@@ -0,0 +1,208 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from math import ceil
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException, Request, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from conf.config import settings
+
+
+async def default_identifier(request: Request) -> str:
+    """
+    Identifies the client by IP address and path, like ``fastapi_limiter``.
+
+    :param request: Current request.
+    :type request: Request
+    :return: Rate limit key.
+    :rtype: str
+    """
+    forwarded = request.headers.get('X-Forwarded-For')
+    ip = forwarded.split(',')[0] if forwarded else request.client.host
+    return f'{ip}:{request.scope["path"]}'
+
+
+@dataclass
+class Bucket:
+    capacity: int
+    period: float
+    tokens: float
+    updated: float
+    window: int = 0
+    pending: int = 0
+    sent: int = 0
+    remote: int = 0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / self.period)
+        self.updated = now
+
+
+class RateLimitStore:
+    """
+    In-process token buckets that are kept in sync across processes through Redis.
+
+    Every decision is made locally. Hits are counted per fixed window of the bucket period and pushed to Redis in one
+    pipeline every ``sync_interval`` seconds, or earlier once ``sync_batch`` hits are pending; the replies tell how
+    many hits other processes made in the window, and those are taken from the local bucket. Without Redis, or while
+    it is unreachable, each process enforces the limits on its own.
+    """
+
+    prefix = 'rate-limit'
+
+    def __init__(self, sync_interval: float, sync_batch: int):
+        self.sync_interval = sync_interval
+        self.sync_batch = sync_batch
+        self.redis: Redis | None = None
+        self.buckets: dict[str, Bucket] = {}
+        self.degraded = False
+        self.allowed = 0
+        self.denied = 0
+        self.syncs = 0
+        self.sync_errors = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._sync_task: asyncio.Task | None = None
+
+    def init(self, redis: Redis) -> None:
+        """
+        Enables syncing through Redis. Does not connect, so startup does not depend on Redis being up.
+
+        :param redis: Redis client created on application startup.
+        :type redis: Redis
+        :return: None.
+        :rtype: None
+        """
+        self.redis = redis
+
+    def hit(self, key: str, times: int, period: float) -> float:
+        """
+        Takes a token from the bucket of a key.
+
+        :param key: Rate limit key.
+        :type key: str
+        :param times: Bucket capacity, requests per period.
+        :type times: int
+        :param period: Period in seconds.
+        :type period: float
+        :return: 0 if the request is allowed, otherwise seconds until a token is available.
+        :rtype: float
+        """
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = Bucket(times, period, times, now)
+        bucket.refill(now)
+        self._maybe_sync(now)
+        if bucket.tokens < 1:
+            self.denied += 1
+            return (1 - bucket.tokens) * period / times
+        bucket.tokens -= 1
+        bucket.pending += 1
+        self._pending += 1
+        self.allowed += 1
+        return 0
+
+    def _maybe_sync(self, now: float) -> None:
+        if self._sync_task is not None and not self._sync_task.done():
+            return
+        if now - self._last_sync < self.sync_interval and self._pending < self.sync_batch:
+            return
+        self._last_sync = now
+        self._sync_task = asyncio.get_running_loop().create_task(self.sync())
+
+    async def sync(self) -> None:
+        """
+        Drops idle buckets and exchanges pending hits with Redis.
+
+        :return: None.
+        :rtype: None
+        """
+        now = time.monotonic()
+        for key, bucket in list(self.buckets.items()):
+            if not bucket.pending and now - bucket.updated > bucket.period:
+                del self.buckets[key]
+        if self.redis is None:
+            return
+
+        batch = []
+        wall = time.time()
+        for key, bucket in self.buckets.items():
+            window = int(wall // bucket.period)
+            if window != bucket.window:
+                bucket.window, bucket.sent, bucket.remote = window, 0, 0
+            batch.append((key, bucket, window, bucket.pending))
+            bucket.pending = 0
+        self._pending = 0
+        if not batch:
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, bucket, window, count in batch:
+                    redis_key = f'{self.prefix}:{key}:{window}'
+                    pipe.incrby(redis_key, count)
+                    pipe.expire(redis_key, ceil(bucket.period) * 2)
+                totals = (await pipe.execute())[::2]
+        except (RedisError, OSError) as e:
+            print(e)
+            self.degraded = True
+            self.sync_errors += 1
+            return
+        self.degraded = False
+        self.syncs += 1
+
+        for (key, bucket, window, count), total in zip(batch, totals):
+            if bucket.window != window:
+                continue
+            bucket.sent += count
+            others = int(total) - bucket.sent
+            if others > bucket.remote:
+                bucket.refill(time.monotonic())
+                bucket.tokens = max(bucket.tokens - (others - bucket.remote), -bucket.capacity)
+                bucket.remote = others
+
+    def stats(self) -> dict:
+        """
+        Gets limiter metrics.
+
+        :return: Bucket count, decision totals, sync totals and whether Redis is unreachable.
+        :rtype: dict
+        """
+        return {
+            'buckets': len(self.buckets),
+            'allowed': self.allowed,
+            'denied': self.denied,
+            'syncs': self.syncs,
+            'sync_errors': self.sync_errors,
+            'degraded': self.degraded,
+        }
+
+
+rate_limits = RateLimitStore(settings.rate_limit_sync_interval, settings.rate_limit_sync_batch)
+
+
+class RateLimiter:
+    """
+    Route dependency with the same arguments as ``fastapi_limiter.depends.RateLimiter``::
+
+        @router.post('/', dependencies=[Depends(RateLimiter(times=4, seconds=10))])
+    """
+
+    def __init__(self, times: int = 1, milliseconds: int = 0, seconds: int = 0, minutes: int = 0, hours: int = 0,
+                 identifier: Callable[[Request], Awaitable[str]] = default_identifier,
+                 store: RateLimitStore = rate_limits):
+        self.times = times
+        self.period = (milliseconds + 1000 * seconds + 60000 * minutes + 3600000 * hours) / 1000
+        self.identifier = identifier
+        self.store = store
+
+    async def __call__(self, request: Request) -> None:
+        key = f'{await self.identifier(request)}:{self.times}/{self.period:g}'
+        retry_after = self.store.hit(key, self.times, self.period)
+        if retry_after:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail='Too Many Requests',
+                                headers={'Retry-After': str(ceil(retry_after))})
@@ -0,0 +1,169 @@
+import json
+import time
+import uuid
+
+from fastapi import HTTPException, status
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from conf.config import settings
+
+RETRY_AFTER = 5
+
+
+class MemoryBackend:
+    """
+    In-process stand-in for the few Redis commands the token store uses until :meth:`RefreshTokenStore.init` is
+    called, i.e. in tests and scripts that do not run the application startup.
+    """
+
+    def __init__(self):
+        self._values: dict[str, tuple[float, object]] = {}
+
+    def _get(self, key: str):
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> str | None:
+        return self._get(key)
+
+    async def set(self, key: str, value: str, ex: int, nx: bool = False) -> bool | None:
+        if nx and self._get(key) is not None:
+            return None
+        self._values[key] = (time.monotonic() + ex, value)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._values.pop(key, None) is not None for key in keys)
+
+    async def sadd(self, key: str, *members: str) -> int:
+        current = self._get(key) or set()
+        self._values[key] = (self._values.get(key, (float('inf'),))[0], current | set(members))
+        return len(members)
+
+    async def srem(self, key: str, *members: str) -> int:
+        current = self._get(key) or set()
+        if current:
+            self._values[key] = (self._values[key][0], current - set(members))
+        return len(current & set(members))
+
+    async def smembers(self, key: str) -> set:
+        return set(self._get(key) or set())
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        if self._get(key) is None:
+            return False
+        self._values[key] = (time.monotonic() + seconds, self._values[key][1])
+        return True
+
+
+class RefreshTokenStore:
+    """
+    Refresh token registry keyed by token id (jti).
+
+    Every login starts a rotation family, one per device session. Refreshing consumes the presented token and
+    issues the next one in the same family. Presenting an already consumed token means it leaked, so the whole
+    family is revoked. Entries expire together with the tokens.
+
+    Tokens cannot be issued or checked without Redis, so a Redis failure is answered with 503 and ``Retry-After``.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.backend: Redis | MemoryBackend = MemoryBackend()
+
+    def init(self, redis: Redis) -> None:
+        """
+        Switches the store to Redis.
+
+        :param redis: Redis client created on application startup.
+        :type redis: Redis
+        :return: None.
+        :rtype: None
+        """
+        self.backend = redis
+
+    async def issue(self, email: str, family: str | None = None) -> tuple[str, str]:
+        """
+        Registers a new refresh token.
+
+        :param email: Token owner.
+        :type email: str
+        :param family: Rotation family to continue, a new session is started if None (OPTIONAL).
+        :type family: str | None
+        :return: Token id and family id to put into the token claims.
+        :rtype: tuple[str, str]
+        """
+        try:
+            return await self._issue(email, family)
+        except RedisError as e:
+            raise self._unavailable(e)
+
+    async def _issue(self, email: str, family: str | None) -> tuple[str, str]:
+        jti, family = uuid.uuid4().hex, family or uuid.uuid4().hex
+        await self.backend.set(f'rt:{jti}', json.dumps({'sub': email, 'fam': family}), ex=self.ttl)
+        await self.backend.sadd(f'rtf:{family}', jti)
+        await self.backend.expire(f'rtf:{family}', self.ttl)
+        await self.backend.sadd(f'rts:{email}', family)
+        await self.backend.expire(f'rts:{email}', self.ttl)
+        return jti, family
+
+    async def rotate(self, payload: dict) -> tuple[str, str]:
+        """
+        Consumes a refresh token and issues the next one of its family.
+
+        :param payload: Verified claims of the presented refresh token.
+        :type payload: dict
+        :return: Token id and family id of the new token.
+        :rtype: tuple[str, str]
+        """
+        try:
+            return await self._rotate(payload)
+        except RedisError as e:
+            raise self._unavailable(e)
+
+    async def _rotate(self, payload: dict) -> tuple[str, str]:
+        invalid_token = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid refresh token')
+        jti, family, email = payload.get('jti'), payload.get('fam'), payload.get('sub')
+        if not jti or not family:
+            raise invalid_token
+        record = await self.backend.get(f'rt:{jti}')
+        if record is None or json.loads(record) != {'sub': email, 'fam': family}:
+            raise invalid_token
+        if not await self.backend.set(f'rtu:{jti}', '1', ex=self.ttl, nx=True):
+            await self.revoke_family(email, family)
+            raise invalid_token
+        return await self._issue(email, family)
+
+    @staticmethod
+    def _unavailable(error: RedisError) -> HTTPException:
+        print(error)
+        return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                             detail='Token store is unavailable, try again later',
+                             headers={'Retry-After': str(RETRY_AFTER)})
+
+    async def revoke_family(self, email: str, family: str) -> None:
+        """
+        Revokes every token of a rotation family, i.e. ends one device session.
+
+        :param email: Token owner.
+        :type email: str
+        :param family: Rotation family.
+        :type family: str
+        :return: None.
+        :rtype: None
+        """
+        jtis = await self.backend.smembers(f'rtf:{family}')
+        if jtis:
+            await self.backend.delete(*(f'rt:{jti}' for jti in jtis))
+        await self.backend.delete(f'rtf:{family}')
+        await self.backend.srem(f'rts:{email}', family)
+
+
+token_store = RefreshTokenStore(settings.refresh_token_ttl)
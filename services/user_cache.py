@@ -0,0 +1,132 @@
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from conf.config import settings
+from db.models import User
+
+CACHED_FIELDS = ('id', 'username', 'email', 'confirmed', 'created_at', 'avatar', 'avatar_hash')
+
+
+class UserCache:
+    """
+    Two tier cache of authenticated users keyed by email: an in-process TTL/LRU tier and an optional Redis tier.
+
+    Only non-secret columns are cached; cached users are detached ``User`` objects. Invalidation clears the local
+    tier of this process and the shared Redis tier, so other processes see a change after at most ``local_ttl``.
+    """
+
+    def __init__(self, local_ttl: float, maxsize: int, redis_ttl: int):
+        self.local_ttl = local_ttl
+        self.maxsize = maxsize
+        self.redis_ttl = redis_ttl
+        self.redis: Redis | None = None
+        self._local: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def init(self, redis: Redis) -> None:
+        """
+        Enables the Redis tier.
+
+        :param redis: Redis client created on application startup.
+        :type redis: Redis
+        :return: None.
+        :rtype: None
+        """
+        self.redis = redis
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return f'user:{email}'
+
+    @staticmethod
+    def _to_user(data: dict) -> User:
+        data = dict(data)
+        if isinstance(data.get('created_at'), str):
+            data['created_at'] = datetime.fromisoformat(data['created_at'])
+        return User(**data)
+
+    def _set_local(self, email: str, data: dict) -> None:
+        self._local[email] = (time.monotonic() + self.local_ttl, data)
+        self._local.move_to_end(email)
+        while len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+
+    async def get(self, email: str) -> User | None:
+        """
+        Gets a cached user.
+
+        :param email: Email address.
+        :type email: str
+        :return: Detached user, or None on cache miss.
+        :rtype: User | None
+        """
+        entry = self._local.get(email)
+        if entry:
+            expires, data = entry
+            if expires > time.monotonic():
+                self._local.move_to_end(email)
+                return self._to_user(data)
+            del self._local[email]
+        if self.redis is None:
+            return None
+        try:
+            cached = await self.redis.get(self._key(email))
+        except RedisError as e:
+            print(e)
+            return None
+        if cached is None:
+            return None
+        data = json.loads(cached)
+        self._set_local(email, data)
+        return self._to_user(data)
+
+    async def set(self, user: User) -> None:
+        """
+        Caches a user.
+
+        :param user: User loaded from the database.
+        :type user: User
+        :return: None.
+        :rtype: None
+        """
+        data = {field: getattr(user, field) for field in CACHED_FIELDS}
+        self._set_local(user.email, data)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(self._key(user.email), json.dumps(data, default=datetime.isoformat), ex=self.redis_ttl)
+        except RedisError as e:
+            print(e)
+
+    async def invalidate(self, email: str) -> None:
+        """
+        Removes a user from both tiers.
+
+        :param email: Email address.
+        :type email: str
+        :return: None.
+        :rtype: None
+        """
+        self._local.pop(email, None)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(self._key(email))
+        except RedisError as e:
+            print(e)
+
+    def clear(self) -> None:
+        """
+        Drops the in-process tier.
+
+        :return: None.
+        :rtype: None
+        """
+        self._local.clear()
+
+
+user_cache = UserCache(settings.user_cache_local_ttl, settings.user_cache_maxsize, settings.user_cache_redis_ttl)
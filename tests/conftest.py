@@ -1,7 +1,11 @@
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 import sys
 import os
@@ -9,9 +13,12 @@ import os
 sys.path.append(os.path.abspath('.'))
 
 from db.models import Base
-from db.connect_db import get_db
+from db.connect_db import get_async_db, get_primary_db
+from db.query_stats import instrument_engine, record_queries
 
 from main import app
+from services.user_cache import user_cache
+from services.contacts_cache import contacts_cache
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -21,6 +28,11 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs every request in its own event loop, so connections must not be pooled
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+instrument_engine(async_engine)
+
 
 @pytest.fixture(scope="module")
 def session():
@@ -28,6 +40,8 @@ def session():
 
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    user_cache.clear()
+    contacts_cache.clear()
 
     db = TestingSessionLocal()
     try:
@@ -40,13 +54,12 @@ def session():
 def client(session):
     # Dependency override
 
-    def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
 
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_primary_db] = override_get_async_db
 
     yield TestClient(app)
 
@@ -54,3 +67,18 @@ def client(session):
 @pytest.fixture(scope="module")
 def user():
     return {"username": "Pupos", "email": "pupos@example.com", "password": "123456789"}
+
+
+@pytest.fixture
+def query_budget():
+    # Fails the test when the block runs more queries than the endpoint is allowed, or repeats one statement
+
+    @contextmanager
+    def budget(max_queries, max_repeats=None):
+        with record_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, f'query budget of {max_queries} exceeded: {stats.report()}'
+        if max_repeats is not None:
+            assert not stats.repeated(max_repeats + 1), f'statement repeated over {max_repeats} times: {stats.report()}'
+
+    return budget
@@ -1,11 +1,12 @@
-from unittest.mock import MagicMock
+import asyncio
 
-from db.models import User
+from db.connect_db import get_async_db
+from db.models import User, EmailMessage
+from main import app
+from services.auth import auth_service
 
 
-def test_create_user(client, user, monkeypatch):
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("routes.auth.send_email", mock_send_email)
+def test_create_user(client, session, user):
     response = client.post(
         "/api/auth/signup",
         json=user,
@@ -14,6 +15,9 @@ def test_create_user(client, user, monkeypatch):
     data = response.json()
     assert data["user"]["email"] == user.get("email")
     assert "id" in data["user"]
+    outbox = session.query(EmailMessage).filter(EmailMessage.recipient == user.get("email")).all()
+    assert len(outbox) == 1
+    assert outbox[0].status == "pending"
 
 
 def test_repeat_create_user(client, user):
@@ -26,6 +30,28 @@ def test_repeat_create_user(client, user):
     assert data["detail"] == "Account already exists"
 
 
+def test_confirmed_email_uses_primary(client, session, user):
+    replica_override = app.dependency_overrides[get_async_db]
+
+    async def replica_db():
+        raise AssertionError("confirmed_email must not use the replica-routed session")
+        yield
+
+    token = asyncio.run(auth_service.create_email_token({"sub": user.get("email")}))
+    app.dependency_overrides[get_async_db] = replica_db
+    try:
+        response = client.get(f"/api/auth/confirmed_email/{token}")
+    finally:
+        app.dependency_overrides[get_async_db] = replica_override
+    assert response.status_code == 200, response.text
+    assert response.json()["message"] == "Email confirmed"
+    current_user = session.query(User).filter(User.email == user.get("email")).first()
+    session.refresh(current_user)
+    assert current_user.confirmed
+    current_user.confirmed = False
+    session.commit()
+
+
 def test_login_user_not_confirmed(client, user):
     response = client.post(
         "/api/auth/login",
@@ -67,3 +93,49 @@ def test_login_wrong_email(client, user):
     assert response.status_code == 401, response.text
     data = response.json()
     assert data["detail"] == "Invalid email"
+
+
+def test_refresh_token_rotation(client, user):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get('email'), "password": user.get('password')},
+    )
+    first_refresh_token = response.json()["refresh_token"]
+
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {first_refresh_token}"})
+    assert response.status_code == 200, response.text
+    second_refresh_token = response.json()["refresh_token"]
+    assert second_refresh_token != first_refresh_token
+
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {second_refresh_token}"})
+    assert response.status_code == 200, response.text
+    assert response.json()["refresh_token"] != second_refresh_token
+
+
+def test_refresh_token_reuse_revokes_session(client, user):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get('email'), "password": user.get('password')},
+    )
+    stolen_refresh_token = response.json()["refresh_token"]
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {stolen_refresh_token}"})
+    current_refresh_token = response.json()["refresh_token"]
+
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {stolen_refresh_token}"})
+    assert response.status_code == 401, response.text
+    assert response.json()["detail"] == "Invalid refresh token"
+
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {current_refresh_token}"})
+    assert response.status_code == 401, response.text
+
+
+def test_refresh_token_sessions_are_independent(client, user):
+    tokens = [
+        client.post("/api/auth/login", data={"username": user.get('email'), "password": user.get('password')}).json()["refresh_token"]
+        for _ in range(2)
+    ]
+    client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {tokens[0]}"})
+    client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {tokens[0]}"})
+
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {tokens[1]}"})
+    assert response.status_code == 200, response.text
@@ -0,0 +1,410 @@
+import asyncio
+import base64
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from db.connect_db import get_async_db
+from db.models import User, Contact
+from main import app
+from services.auth import auth_service
+from services.contacts_cache import contacts_cache
+from services.user_cache import user_cache
+
+
+@pytest.fixture(scope="module")
+def token(session, user):
+    current_user = User(username=user.get('username'), email=user.get('email'), password='hash', confirmed=True)
+    session.add(current_user)
+    session.commit()
+    for i in range(5):
+        session.add(Contact(name=f'Name{i}', lastname=f'Lastname{4 - i}', email=f'contact{i}@example.com',
+                            phone_number='+380666666666', birthday=date(2000, 1, 1), user_id=current_user.id))
+    soon = date.today() + timedelta(days=3)
+    later = date.today() + timedelta(days=30)
+    session.add(Contact(name='Soon', lastname='Birthday', email='soon@example.com', phone_number='+380666666666',
+                        birthday=date(2000, soon.month, soon.day), user_id=current_user.id))
+    session.add(Contact(name='Later', lastname='Birthday', email='later@example.com', phone_number='+380666666666',
+                        birthday=date(2000, later.month, later.day), user_id=current_user.id))
+    session.commit()
+    return asyncio.run(auth_service.create_access_token(data={'sub': user.get('email')}))
+
+
+def test_get_contacts_first_page(client, token):
+    response = client.get("/api/contacts/", params={"limit": 2}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [contact["name"] for contact in data] == ["Name0", "Name1"]
+    assert "X-Next-Cursor" in response.headers
+
+
+def test_get_contacts_without_limit_returns_all(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/api/contacts/", headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 7
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_contacts_follow_cursor(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    names, cursor = [], None
+    while True:
+        params = {"limit": 2, "order_by": "lastname"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/contacts/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        names += [contact["lastname"] for contact in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert names == ["Birthday", "Birthday"] + [f"Lastname{i}" for i in range(5)]
+
+
+def test_get_contacts_invalid_cursor(client, token):
+    response = client.get("/api/contacts/", params={"cursor": "garbage"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.parametrize("order_by, keys", [("id", [{"x": 1}]), ("id", ["1"]), ("id", [True]),
+                                            ("lastname", [1, 1]), ("lastname", ["Lastname0", "1"])])
+def test_get_contacts_cursor_key_types(client, token, order_by, keys):
+    cursor = base64.urlsafe_b64encode(json.dumps({"o": order_by, "k": keys}).encode()).decode()
+    response = client.get("/api/contacts/", params={"cursor": cursor, "order_by": order_by},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_get_contacts_cors_exposes_cursor(client, token):
+    response = client.get("/api/contacts/", params={"limit": 1},
+                          headers={"Authorization": f"Bearer {token}", "Origin": "http://localhost:3000"})
+    assert response.status_code == 200, response.text
+    exposed = response.headers["Access-Control-Expose-Headers"]
+    assert "X-Next-Cursor" in exposed and "ETag" in exposed
+
+
+def test_get_contacts_nearest_birthday(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/api/contacts/", params={"nearest_birthday": True}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [contact["name"] for contact in response.json()] == ["Soon"]
+
+    response = client.get("/api/contacts/", params={"nearest_birthday": True, "birthday_days": 31}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [contact["name"] for contact in response.json()] == ["Soon", "Later"]
+
+
+def test_get_contacts_nearest_birthday_follows_date(client, token, monkeypatch):
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"nearest_birthday": True, "birthday_days": 1}
+    response = client.get("/api/contacts/", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+    etag = response.headers["ETag"]
+
+    class FakeDate(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=3)
+
+    monkeypatch.setattr("routes.contacts.date", FakeDate)
+    monkeypatch.setattr("repository.contacts.date", FakeDate)
+    response = client.get("/api/contacts/", params=params, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200, response.text
+    assert [contact["name"] for contact in response.json()] == ["Soon"]
+    assert response.headers["ETag"] != etag
+
+
+def test_import_contacts_csv(client, token):
+    body = (
+        "name,lastname,email,phone_number,birthday\n"
+        "Csv,Imported,csv@example.com,+380666666666,1990-05-01\n"
+        "\"Quoted, Name\",Imported,quoted@example.com,+380666666666,1990-05-02\n"
+        "Broken,Imported,not-an-email,+380666666666,1990-05-03\n"
+    )
+    response = client.post("/api/contacts/import", content=body,
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"})
+    assert response.status_code == 201, response.text
+    data = response.json()
+    assert data["imported"] == 2
+    assert data["failed"] == 1
+    assert data["errors"][0]["row"] == 3
+    assert data["errors"][0]["errors"][0].startswith("email")
+
+    response = client.get("/api/contacts/", params={"lastname": "Imported"}, headers={"Authorization": f"Bearer {token}"})
+    assert sorted(contact["name"] for contact in response.json()) == ["Csv", "Quoted, Name"]
+
+
+def test_import_contacts_ndjson(client, token):
+    body = (
+        '{"name": "Json", "lastname": "Line", "email": "json@example.com", "phone_number": "+380666666666", "birthday": "1990-05-01"}\n'
+        'not json\n'
+    )
+    response = client.post("/api/contacts/import", content=body,
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"})
+    assert response.status_code == 201, response.text
+    data = response.json()
+    assert data["imported"] == 1
+    assert data["errors"] == [{"row": 2, "errors": ["Row is not a JSON object"]}]
+
+
+def test_import_contacts_unsupported_type(client, token):
+    response = client.post("/api/contacts/import", content="{}",
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"})
+    assert response.status_code == 415, response.text
+
+
+def test_export_contacts_ndjson(client, token):
+    response = client.get("/api/contacts/export", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 10
+    assert rows[0]["name"] == "Name0"
+    assert rows[0]["birthday"] == "2000-01-01"
+
+
+def test_export_contacts_csv(client, token):
+    response = client.get("/api/contacts/export", params={"format": "csv"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    lines = response.text.splitlines()
+    assert lines[0] == "id,name,lastname,email,phone_number,birthday"
+    assert len(lines) == 11
+    assert '"Quoted, Name"' in response.text
+
+
+def test_import_contacts_csv_stray_quotes(client, token):
+    valid = "".join(f"Stray{i},Quotes,stray{i}@example.com,+380666666666,1990-06-0{i + 1}\n" for i in range(5))
+    body = (
+        "name,lastname,email,phone_number,birthday\n"
+        "Bob \"Bobby\" Smith,Quotes,bobby@example.com,+380666666666,1990-06-10\n"
+        + valid +
+        "\"Multi\nLine\",Quotes,multi@example.com,+380666666666,1990-06-11\n"
+        "\"Unterminated,Quotes,open@example.com,+380666666666,1990-06-12\n"
+    )
+    response = client.post("/api/contacts/import", content=body,
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"})
+    assert response.status_code == 201, response.text
+    data = response.json()
+    assert data["imported"] == 7
+    assert [error["row"] for error in data["errors"]] == [8]
+    assert data["errors"][0]["errors"][0].startswith("Malformed CSV row")
+
+    response = client.get("/api/contacts/", params={"lastname": "Quotes"}, headers={"Authorization": f"Bearer {token}"})
+    names = {contact["name"] for contact in response.json()}
+    assert {'Bob "Bobby" Smith', "Multi\nLine", "Stray4"} <= names
+
+
+def test_search_contacts_prefix(client, token):
+    response = client.get("/api/contacts/", params={"q": "quot"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert response.json()[0]["name"] == "Quoted, Name"
+
+
+def test_search_contacts_fuzzy(client, token):
+    response = client.get("/api/contacts/", params={"q": "Birthdya"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert {contact["lastname"] for contact in response.json()} >= {"Birthday"}
+
+
+def test_search_contacts_follows_updates(client, session, token):
+    contact = session.query(Contact).filter(Contact.name == "Json").first()
+    contact.lastname = "Renamed"
+    session.commit()
+    asyncio.run(contacts_cache.bump(contact.user_id))
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/contacts/", params={"q": "renamed"}, headers=headers).json()[0]["name"] == "Json"
+
+    session.delete(contact)
+    session.commit()
+    asyncio.run(contacts_cache.bump(contact.user_id))
+    assert client.get("/api/contacts/", params={"q": "renamed"}, headers=headers).json() == []
+
+
+def test_get_contacts_fields(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/api/contacts/", params={"fields": "name,lastname", "limit": 2, "order_by": "lastname"}, headers=headers)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert set(data[0]) == {"id", "name", "lastname"}
+    assert "X-Next-Cursor" in response.headers
+
+    response = client.get(f"/api/contacts/{data[0]['id']}", params={"fields": "email"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert set(response.json()) == {"id", "email"}
+
+
+def test_get_contacts_unknown_fields(client, token):
+    response = client.get("/api/contacts/", params={"fields": "name,password"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "Unknown fields: password"
+
+
+def test_create_contact_rate_limit(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    statuses = []
+    for i in range(5):
+        response = client.post("/api/contacts/", json={"name": f"Limited{i}", "lastname": "Limit", "email": f"limited{i}@example.com",
+                                                       "phone_number": "+380666666666", "birthday": "2000-01-01"}, headers=headers)
+        statuses.append(response.status_code)
+    assert statuses == [200, 200, 200, 200, 429], statuses
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_get_contacts_etag(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/api/contacts/", params={"limit": 2}, headers=headers)
+    assert response.status_code == 200, response.text
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/contacts/", params={"limit": 2}, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    response = client.get("/api/contacts/", params={"limit": 3}, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_get_contacts_replica_reads_not_cached(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    primary_override = app.dependency_overrides[get_async_db]
+
+    async def override_replica_db():
+        async for db in primary_override():
+            db.info["replica"] = True
+            yield db
+
+    contacts_cache.clear()
+    user_cache.clear()
+    app.dependency_overrides[get_async_db] = override_replica_db
+    try:
+        response = client.get("/api/contacts/", params={"limit": 4}, headers=headers)
+        assert response.status_code == 200, response.text
+        assert "ETag" not in response.headers
+        assert asyncio.run(user_cache.get("pupos@example.com")) is None
+    finally:
+        app.dependency_overrides[get_async_db] = primary_override
+
+    response = client.get("/api/contacts/", params={"limit": 4}, headers=headers)
+    etag = response.headers["ETag"]
+    app.dependency_overrides[get_async_db] = override_replica_db
+    try:
+        response = client.get("/api/contacts/", params={"limit": 4}, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+    finally:
+        app.dependency_overrides[get_async_db] = primary_override
+
+
+def test_get_contacts_cached_without_database(client, token, monkeypatch):
+    headers = {"Authorization": f"Bearer {token}"}
+    expected = client.get("/api/contacts/", params={"limit": 2}, headers=headers)
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("database was queried")
+
+    monkeypatch.setattr("routes.contacts.repository_contacts.get_contacts", fail)
+    response = client.get("/api/contacts/", params={"limit": 2}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == expected.json()
+    assert response.headers["X-Next-Cursor"] == expected.headers["X-Next-Cursor"]
+
+
+def test_get_contact_etag_changes_after_write(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    contact = client.get("/api/contacts/", params={"limit": 1}, headers=headers).json()[0]
+    response = client.get(f"/api/contacts/{contact['id']}", headers=headers)
+    etag = response.headers["ETag"]
+
+    body = {**contact, "lastname": "Changed"}
+    del body["id"]
+    assert client.put(f"/api/contacts/{contact['id']}", json=body, headers=headers).status_code == 200
+
+    response = client.get(f"/api/contacts/{contact['id']}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200, response.text
+    assert response.json()["lastname"] == "Changed"
+    assert response.headers["ETag"] != etag
+
+
+def test_get_contacts_compressed(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    plain = client.get("/api/contacts/", params={"limit": 50}, headers={**headers, "Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    response = client.get("/api/contacts/", params={"limit": 50}, headers={**headers, "Accept-Encoding": "br, gzip"})
+    assert response.status_code == 200, response.text
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.json() == plain.json()
+    assert response.headers["ETag"] == f"W/{plain.headers['ETag']}"
+
+
+def test_batch_contacts(client, session, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    other = User(username="other", email="other@example.com", password="hash", confirmed=True)
+    session.add(other)
+    session.commit()
+    foreign = Contact(name="Foreign", lastname="Contact", email="foreign@example.com", phone_number="+380666666666",
+                      birthday=date(2000, 1, 1), user_id=other.id)
+    session.add(foreign)
+    session.commit()
+    ids = [contact["id"] for contact in client.get("/api/contacts/", params={"limit": 3}, headers=headers).json()]
+
+    response = client.post("/api/contacts/batch", json={
+        "get": [ids[0], foreign.id],
+        "update": [{"id": ids[1], "lastname": "Batched", "birthday": "2000-12-31"}, {"id": foreign.id, "name": "Stolen"}],
+        "delete": [ids[2], foreign.id, 999999],
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [(item["id"], item["status"]) for item in data["get"]] == [(ids[0], 200), (foreign.id, 404)]
+    assert data["get"][1]["contact"] is None
+    assert [item["status"] for item in data["update"]] == [200, 404]
+    assert data["update"][0]["contact"]["lastname"] == "Batched"
+    assert data["update"][0]["contact"]["birthday"] == "2000-12-31"
+    assert [item["status"] for item in data["delete"]] == [200, 404, 404]
+
+    assert client.get(f"/api/contacts/{ids[1]}", headers=headers).json()["lastname"] == "Batched"
+    assert client.get(f"/api/contacts/{ids[2]}", headers=headers).status_code == 404
+    session.refresh(foreign)
+    assert foreign.name == "Foreign"
+    assert session.get(Contact, ids[1]).birthday_mmdd == 1231
+
+
+def test_get_contacts_query_budget(client, token, query_budget):
+    headers = {"Authorization": f"Bearer {token}"}
+    contacts_cache.clear()
+    with query_budget(2, max_repeats=1):
+        response = client.get("/api/contacts/", params={"limit": 50}, headers=headers)
+    assert response.status_code == 200, response.text
+    with query_budget(1, max_repeats=1):
+        response = client.get(f"/api/contacts/{response.json()[0]['id']}", headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def test_batch_contacts_query_budget(client, token, query_budget):
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = [contact["id"] for contact in client.get("/api/contacts/", params={"limit": 4}, headers=headers).json()]
+    with query_budget(5, max_repeats=1):
+        response = client.post("/api/contacts/batch", json={
+            "get": ids[:2],
+            "update": [{"id": contact_id, "lastname": "Budget"} for contact_id in ids[2:]],
+        }, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def test_batch_contacts_null_birthday_ignored(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    contact = client.get("/api/contacts/", params={"limit": 1}, headers=headers).json()[0]
+    response = client.post("/api/contacts/batch", json={"update": [{"id": contact["id"], "birthday": None}]},
+                           headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["update"][0]["contact"]["birthday"] == contact["birthday"]
+    assert client.get(f"/api/contacts/{contact['id']}", headers=headers).json()["birthday"] == contact["birthday"]
+
+
+def test_batch_contacts_invalid_item(client, token):
+    response = client.post("/api/contacts/batch", json={"update": [{"id": 1, "email": "not an email"}]},
+                           headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422, response.text
@@ -0,0 +1,67 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from db.query_stats import instrument_engine
+from services.metrics import MetricsMiddleware, MetricsRegistry, metrics
+
+
+def test_metrics_records_route_templates(client):
+    detail = ("GET", "/api/contacts/{contact_id}", 401)
+    unmatched = ("GET", "<unmatched>", 404)
+    before = metrics.requests[detail], metrics.requests[unmatched]
+
+    client.get("/api/contacts/123")
+    client.get("/no/such/path")
+
+    assert (metrics.requests[detail], metrics.requests[unmatched]) == (before[0] + 1, before[1] + 1)
+    assert metrics.latency["GET", "/api/contacts/{contact_id}"].count >= 1
+    assert metrics.response_size["GET", "/api/contacts/{contact_id}"].sum > 0
+
+
+def test_metrics_request_size(client):
+    before = metrics.request_size["POST", "/api/auth/signup"].sum
+
+    client.post("/api/auth/signup", json={"username": "x"})
+
+    assert metrics.request_size["POST", "/api/auth/signup"].sum - before == len('{"username": "x"}')
+
+
+def test_metrics_query_debug(capsys):
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    registry = MetricsRegistry()
+    debug_app = FastAPI()
+    debug_app.add_middleware(MetricsMiddleware, registry=registry, query_debug=True, repeat_threshold=3)
+
+    @debug_app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        with engine.connect() as conn:
+            return [conn.execute(text("SELECT :id"), {"id": item_id + i}).scalar() for i in range(3)]
+
+    response = TestClient(debug_app).get("/items/1")
+    engine.dispose()
+
+    assert response.status_code == 200, response.text
+    assert response.headers["X-DB-Query-Count"] == "3"
+    assert response.headers["X-DB-Query-Time"].endswith("ms")
+    assert registry.queries["GET", "/items/{item_id}"].sum == 3
+    assert registry.repeated_queries["GET", "/items/{item_id}"] == 1
+    assert "GET /items/1 200: 3 queries in " in capsys.readouterr().out
+
+
+def test_metrics_endpoint(client):
+    client.get("/api/contacts/123")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'http_requests_total{method="GET",route="/api/contacts/{contact_id}",status="401"}' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/contacts/{contact_id}",le="+Inf"}' in text
+    assert 'http_requests_in_progress{method="GET"} 1' in text
+    assert 'db_pool_checked_out{pool="primary"}' in text
+    assert "# TYPE db_pool_wait_seconds histogram" in text
+    assert "# TYPE http_request_db_queries histogram" in text
+    assert "# TYPE password_hash_rejected_total counter" in text
+    assert "rate_limit_degraded 0" in text
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from db.models import User
+from services.auth import auth_service
+from services.avatar import avatar_service, FakeUploader
+
+
+def make_image(size, color, fmt="PNG"):
+    output = BytesIO()
+    Image.new("RGB", size, color).save(output, fmt)
+    return output.getvalue()
+
+
+PNG = make_image((800, 400), "red")
+
+
+@pytest.fixture(scope="module")
+def token(session, user):
+    current_user = User(username=user.get('username'), email=user.get('email'), password='hash', confirmed=True)
+    session.add(current_user)
+    session.commit()
+    return asyncio.run(auth_service.create_access_token(data={'sub': user.get('email')}))
+
+
+@pytest.fixture
+def uploader(monkeypatch):
+    fake = FakeUploader()
+    monkeypatch.setattr(avatar_service, "uploader", fake)
+    return fake
+
+
+def test_update_avatar(client, token, uploader):
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", PNG, "image/png")},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert response.json()["avatar"] == "memory://avatars/QuotesApp/Pupos.webp"
+    with Image.open(BytesIO(uploader.files["QuotesApp/Pupos"])) as image:
+        assert image.format == "WEBP"
+        assert image.size == (250, 250)
+
+
+def test_update_avatar_same_image_skips_upload(client, token, uploader):
+    jpeg = make_image((800, 400), "red", "JPEG")
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.jpg", jpeg, "image/jpeg")}, headers=headers)
+    assert response.status_code == 200, response.text
+    uploader.files.clear()
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.jpg", jpeg, "image/jpeg")}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["avatar"] == "memory://avatars/QuotesApp/Pupos.webp"
+    assert uploader.files == {}
+
+
+def test_update_avatar_invalid_image(client, token, uploader):
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", PNG[:100], "image/png")},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 415, response.text
+    assert uploader.files == {}
+
+
+def test_update_avatar_too_many_pixels(client, token, uploader, monkeypatch):
+    monkeypatch.setattr(avatar_service, "max_pixels", 1000)
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", PNG, "image/png")},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 413, response.text
+
+
+def test_update_avatar_wrong_content_type(client, token, uploader):
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.txt", b"hello", "text/plain")},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 415, response.text
+    assert uploader.files == {}
+
+
+def test_update_avatar_content_does_not_match(client, token, uploader):
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", b"<svg></svg>", "image/png")},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 415, response.text
+
+
+def test_update_avatar_too_large(client, token, uploader, monkeypatch):
+    monkeypatch.setattr(avatar_service, "max_size", 50)
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", PNG, "image/png")},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 413, response.text
+    assert uploader.files == {}
+
+
+def test_update_avatar_timeout(client, token, uploader, monkeypatch):
+    def slow_upload(file, public_id):
+        time.sleep(0.5)
+        return "memory://slow"
+
+    monkeypatch.setattr(uploader, "upload", slow_upload)
+    monkeypatch.setattr(avatar_service, "timeout", 0.05)
+    response = client.patch("/api/users/avatar", files={"file": ("avatar.png", PNG, "image/png")},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 504, response.text
@@ -0,0 +1,76 @@
+import gzip
+import unittest
+
+import brotli
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from services.compression import CompressionMiddleware, choose_encoding
+
+BODY = b'{"name":"Name"}' * 200
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get('/large')
+    def large():
+        return Response(BODY, media_type='application/json', headers={'ETag': '"1-2-3"'})
+
+    @app.get('/small')
+    def small():
+        return Response(b'{}', media_type='application/json')
+
+    @app.get('/image')
+    def image():
+        return Response(BODY, media_type='image/png')
+
+    @app.get('/stream')
+    def stream():
+        return StreamingResponse(iter([b'{"a":1}\n'] * 500), media_type='application/x-ndjson')
+
+    return app
+
+
+class TestChooseEncoding(unittest.TestCase):
+    def test_prefers_brotli(self):
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+
+    def test_gzip(self):
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+
+    def test_quality(self):
+        self.assertEqual(choose_encoding('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0, gzip;q=0'), None)
+        self.assertEqual(choose_encoding('*'), 'br')
+
+    def test_identity(self):
+        self.assertIsNone(choose_encoding(''))
+        self.assertIsNone(choose_encoding('identity'))
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(make_app())
+
+    def test_brotli(self):
+        with self.client.stream('GET', '/large', headers={'Accept-Encoding': 'br'}) as response:
+            raw = b''.join(response.iter_raw())
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(response.headers['ETag'], 'W/"1-2-3"')
+        self.assertEqual(int(response.headers['Content-Length']), len(raw))
+        self.assertEqual(brotli.decompress(raw), BODY)
+
+    def test_gzip_stream(self):
+        with self.client.stream('GET', '/stream', headers={'Accept-Encoding': 'gzip'}) as response:
+            raw = b''.join(response.iter_raw())
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(raw), b'{"a":1}\n' * 500)
+
+    def test_not_compressed(self):
+        for path, encoding in (('/small', 'br'), ('/image', 'br'), ('/large', 'identity')):
+            response = self.client.get(path, headers={'Accept-Encoding': encoding})
+            self.assertNotIn('Content-Encoding', response.headers, path)
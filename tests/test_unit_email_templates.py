@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from services.email_templates import TemplateRenderer, TEMPLATE_FOLDER
+
+
+class TestTemplateRenderer(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = Path(self.folder.name)
+        self.renderer = TemplateRenderer(self.path)
+        self.jinja = Environment(loader=FileSystemLoader(self.path), autoescape=select_autoescape(['html']))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, name, source):
+        (self.path / name).write_text(source)
+
+    def assertSameAsJinja(self, name, context):
+        self.assertEqual(self.renderer.render(name, context), self.jinja.get_template(name).render(context))
+
+    def test_email_template_is_split(self):
+        renderer = TemplateRenderer(TEMPLATE_FOLDER)
+        jinja = Environment(loader=FileSystemLoader(TEMPLATE_FOLDER), autoescape=select_autoescape(['html']))
+        context = {'host': 'http://localhost/', 'username': '<Pupos & Co>', 'token': 'a.b.c'}
+
+        result = renderer.render('email_template.html', context)
+
+        self.assertIsNotNone(renderer.compile('email_template.html').parts)
+        self.assertEqual(result, jinja.get_template('email_template.html').render(context))
+        self.assertIn('&lt;Pupos &amp; Co&gt;', result)
+
+    def test_compiled_once(self):
+        self.write('a.html', '<p>{{ name }}</p>')
+
+        first = self.renderer.compile('a.html')
+
+        self.assertIs(self.renderer.compile('a.html'), first)
+
+    def test_preload(self):
+        self.write('a.html', '<p>{{ name }}</p>')
+        self.write('b.txt', 'Hi {{ name }}')
+
+        self.renderer.preload()
+
+        self.assertEqual(set(self.renderer._compiled), {'a.html', 'b.txt'})
+
+    def test_repeated_and_missing_fields(self):
+        self.write('a.html', '<p>{{ name }}, {{ name }}! {{ missing }}</p>')
+
+        self.assertSameAsJinja('a.html', {'name': 'x"y'})
+
+    def test_no_escape_for_text(self):
+        self.write('a.txt', 'Hi {{ name }}')
+
+        self.assertSameAsJinja('a.txt', {'name': '<b>'})
+
+    def test_fallback_for_logic(self):
+        self.write('a.html', '{% if name %}<p>{{ name|upper }}</p>{% endif %}{% for i in items %}{{ i }}{% endfor %}')
+
+        self.assertIsNone(self.renderer.compile('a.html').parts)
+        self.assertSameAsJinja('a.html', {'name': '', 'items': [1, 2]})
+        self.assertSameAsJinja('a.html', {'name': 'x', 'items': []})
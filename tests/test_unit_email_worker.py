@@ -0,0 +1,135 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from aiosmtplib import SMTP
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from db.models import Base, EmailMessage
+from repository.emails import enqueue_email
+from services.email_worker import SMTPPool, EmailWorker
+
+
+class FakeSMTPServer:
+    """
+    Minimal SMTP server that accepts every message except for recipients containing ``bounce``.
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b'220 localhost\r\n')
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith('EHLO') or command.startswith('HELO'):
+                writer.write(b'250 localhost\r\n')
+            elif command.startswith('RCPT') and 'BOUNCE' in command:
+                writer.write(b'550 No such user\r\n')
+            elif command.startswith('DATA'):
+                writer.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                await writer.drain()
+                self.messages.append(await reader.readuntil(b'\r\n.\r\n'))
+                writer.write(b'250 OK\r\n')
+            elif command.startswith('QUIT'):
+                writer.write(b'221 Bye\r\n')
+                await writer.drain()
+                break
+            else:
+                writer.write(b'250 OK\r\n')
+            await writer.drain()
+        writer.close()
+
+
+class TestEmailWorker(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.smtp = FakeSMTPServer()
+        port = await self.smtp.start()
+        self.pool = SMTPPool(1, lambda: SMTP(hostname='127.0.0.1', port=port, use_tls=False))
+        self.worker = EmailWorker(self.session_factory, self.pool, batch_size=10, max_attempts=2, backoff=30,
+                                  max_backoff=3600)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        await self.smtp.stop()
+        await self.engine.dispose()
+
+    async def enqueue(self, recipient, dedupe_key=None):
+        async with self.session_factory() as db:
+            return await enqueue_email(recipient, 'Confirm your email', 'email_template.html',
+                                       {'host': 'http://test/', 'username': 'user', 'token': 'token'}, db,
+                                       dedupe_key=dedupe_key)
+
+    async def outbox(self):
+        async with self.session_factory() as db:
+            return (await db.scalars(select(EmailMessage).order_by(EmailMessage.id))).all()
+
+    async def test_reuses_connection(self):
+        for i in range(3):
+            await self.enqueue(f'user{i}@example.com')
+
+        processed = await self.worker.run_once()
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(len(self.smtp.messages), 3)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(self.pool.connections_opened, 1)
+        self.assertIn(b'http://test/api/auth/confirmed_email/token', self.smtp.messages[0])
+        self.assertTrue(all(email.status == 'sent' for email in await self.outbox()))
+        self.assertEqual(await self.worker.run_once(), 0)
+
+    async def test_dedupe_pending(self):
+        first = await self.enqueue('user@example.com', dedupe_key='confirm:user@example.com')
+        second = await self.enqueue('user@example.com', dedupe_key='confirm:user@example.com')
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(len(await self.outbox()), 1)
+
+    async def test_enqueue_without_commit(self):
+        async with self.session_factory() as db:
+            await enqueue_email('user@example.com', 'Confirm your email', 'email_template.html', {}, db, commit=False)
+            await db.rollback()
+
+        self.assertEqual(await self.outbox(), [])
+
+    async def test_retry_with_backoff(self):
+        await self.enqueue('bounce@example.com')
+        await self.enqueue('user@example.com')
+
+        await self.worker.run_once()
+
+        failed, sent = await self.outbox()
+        self.assertEqual(sent.status, 'sent')
+        self.assertEqual(failed.status, 'pending')
+        self.assertEqual(failed.attempts, 1)
+        self.assertIsNotNone(failed.last_error)
+        self.assertGreater(failed.next_attempt_at, datetime.utcnow() + timedelta(seconds=20))
+        self.assertEqual(await self.worker.run_once(), 0)
+
+    async def test_failed_after_max_attempts(self):
+        email = await self.enqueue('bounce@example.com')
+        for _ in range(2):
+            async with self.session_factory() as db:
+                await db.merge(EmailMessage(id=email.id, next_attempt_at=datetime.utcnow()))
+                await db.commit()
+            await self.worker.run_once()
+
+        failed, = await self.outbox()
+        self.assertEqual(failed.status, 'failed')
+        self.assertEqual(failed.attempts, 2)
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+import unittest
+
+from fastapi import HTTPException
+
+from services.hashing import HashingPool
+
+
+class TestHashingPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.pool = HashingPool(workers=1, queue_limit=1)
+
+    def tearDown(self):
+        self.pool.executor.shutdown(wait=True)
+
+    async def test_run(self):
+        result = await self.pool.run(str.upper, 'password')
+
+        self.assertEqual(result, 'PASSWORD')
+        self.assertEqual(self.pool.stats()['completed'], 1)
+
+    async def test_overflow_rejected(self):
+        release = threading.Event()
+        first = asyncio.create_task(self.pool.run(release.wait))
+        second = asyncio.create_task(self.pool.run(release.wait))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(HTTPException) as e:
+            await self.pool.run(release.wait)
+
+        self.assertEqual(e.exception.status_code, 503)
+        self.assertEqual(self.pool.stats()['rejected'], 1)
+        release.set()
+        await asyncio.gather(first, second)
+        self.assertEqual(self.pool.stats()['completed'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
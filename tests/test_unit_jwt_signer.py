@@ -0,0 +1,91 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import JWTError, jwt
+
+from services.jwt_signer import JWTSigner
+
+
+def generate_es256_keys():
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                            serialization.NoEncryption()).decode()
+    public_pem = private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                       serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+    return private_pem, public_pem
+
+
+class TestJWTSigner(unittest.TestCase):
+    def setUp(self):
+        self.claims = {'sub': 'user@example.com', 'exp': int(time.time()) + 60}
+
+    def test_hs256_round_trip(self):
+        signer = JWTSigner('HS256', secret_key='secret')
+
+        token = signer.encode(self.claims)
+
+        self.assertEqual(signer.decode(token), self.claims)
+        self.assertEqual(jwt.decode(token, 'secret', algorithms='HS256'), self.claims)
+
+    def test_es256_verify_without_private_key(self):
+        private_pem, public_pem = generate_es256_keys()
+        token = JWTSigner('ES256', private_key=private_pem, key_id='2023-10').encode(self.claims)
+        verifier = JWTSigner('ES256', public_keys={'2023-10': public_pem})
+
+        self.assertEqual(jwt.get_unverified_header(token)['kid'], '2023-10')
+        self.assertEqual(verifier.decode(token), self.claims)
+        with self.assertRaises(JWTError):
+            verifier.encode(self.claims)
+
+    def test_es256_key_rotation(self):
+        old_private, old_public = generate_es256_keys()
+        new_private, new_public = generate_es256_keys()
+        old_token = JWTSigner('ES256', private_key=old_private, key_id='old').encode(self.claims)
+        signer = JWTSigner('ES256', private_key=new_private, key_id='new', public_keys={'old': old_public})
+
+        self.assertEqual(signer.decode(old_token), self.claims)
+        self.assertEqual(signer.decode(signer.encode(self.claims)), self.claims)
+
+    def test_unknown_key_id(self):
+        private_pem, _ = generate_es256_keys()
+        token = JWTSigner('ES256', private_key=private_pem, key_id='unknown').encode(self.claims)
+        _, public_pem = generate_es256_keys()
+
+        with self.assertRaises(JWTError):
+            JWTSigner('ES256', public_keys={'a': public_pem, 'b': public_pem}).decode(token)
+
+    def test_decode_cache_skips_verification(self):
+        signer = JWTSigner('HS256', secret_key='secret')
+        token = signer.encode(self.claims)
+
+        with patch('services.jwt_signer.jwt.decode', wraps=jwt.decode) as mock_decode:
+            signer.decode(token)
+            signer.decode(token)
+
+        mock_decode.assert_called_once()
+
+    def test_decode_cache_respects_expiry(self):
+        signer = JWTSigner('HS256', secret_key='secret')
+        token = signer.encode(self.claims)
+        signer.decode(token)
+
+        with patch('services.jwt_signer.time.time', return_value=self.claims['exp'] + 1), \
+                patch('services.jwt_signer.jwt.decode', side_effect=JWTError('Signature has expired.')) as mock_decode:
+            with self.assertRaises(JWTError):
+                signer.decode(token)
+
+        mock_decode.assert_called_once()
+
+    def test_tampered_token(self):
+        signer = JWTSigner('HS256', secret_key='secret')
+        token = JWTSigner('HS256', secret_key='other').encode(self.claims)
+
+        with self.assertRaises(JWTError):
+            signer.decode(token)
+
+
+if __name__ == '__main__':
+    unittest.main()
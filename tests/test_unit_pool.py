@@ -0,0 +1,45 @@
+import sqlite3
+import unittest
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from db.pool import PoolStats, instrumented_pool_class
+
+
+class TestPoolStats(unittest.TestCase):
+    def setUp(self):
+        self.stats = PoolStats('test')
+        pool_class = instrumented_pool_class(QueuePool, self.stats)
+        self.pool = pool_class(lambda: sqlite3.connect(':memory:'), pool_size=1, max_overflow=0, timeout=0.01)
+
+    def test_checkout_is_counted(self):
+        conn = self.pool.connect()
+
+        result = self.stats.snapshot()
+
+        self.assertEqual(result['checked_out'], 1)
+        self.assertEqual(result['wait_seconds']['count'], 1)
+        self.assertEqual(result['wait_seconds']['buckets']['+Inf'], 1)
+        conn.close()
+        self.assertEqual(self.stats.snapshot()['checked_in'], 1)
+
+    def test_timeout_is_counted(self):
+        conn = self.pool.connect()
+
+        with self.assertRaises(exc.TimeoutError):
+            self.pool.connect()
+
+        result = self.stats.snapshot()
+        self.assertEqual(result['timeouts'], 1)
+        self.assertEqual(result['wait_seconds']['count'], 2)
+        conn.close()
+
+    def test_recreated_pool_keeps_stats(self):
+        new_pool = self.pool.recreate()
+
+        self.assertIs(self.stats.pool, new_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
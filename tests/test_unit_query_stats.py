@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from db.query_stats import QueryStats, instrument_engine, record_queries, start_request
+
+
+class TestQueryStats(unittest.TestCase):
+
+    def test_record(self):
+        stats = QueryStats()
+        for i in range(7):
+            stats.record(f'SELECT  {i}\n FROM t', i / 1000)
+        self.assertEqual(stats.count, 7)
+        self.assertAlmostEqual(stats.seconds, 0.021)
+        self.assertEqual([statement for _, statement in stats.slowest],
+                         ['SELECT 6 FROM t', 'SELECT 5 FROM t', 'SELECT 4 FROM t', 'SELECT 3 FROM t', 'SELECT 2 FROM t'])
+
+    def test_repeated(self):
+        stats = QueryStats()
+        for _ in range(3):
+            stats.record('SELECT * FROM contacts WHERE id = ?', 0.001)
+        stats.record('SELECT * FROM users', 0.001)
+        self.assertEqual(stats.repeated(3), {'SELECT * FROM contacts WHERE id = ?': 3})
+        self.assertEqual(stats.repeated(4), {})
+        self.assertIn('x3: SELECT * FROM contacts WHERE id = ?', stats.report())
+
+
+class TestInstrumentEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        instrument_engine(self.engine)
+        instrument_engine(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_record_queries(self):
+        with record_queries() as stats:
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+                conn.execute(text('SELECT 2'))
+        with self.engine.connect() as conn:
+            conn.execute(text('SELECT 3'))
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(set(stats.statements), {'SELECT 1', 'SELECT 2'})
+
+    def test_failed_query(self):
+        with record_queries() as stats:
+            with self.engine.connect() as conn:
+                with self.assertRaises(OperationalError):
+                    conn.execute(text('SELECT * FROM missing'))
+                conn.execute(text('SELECT 1'))
+        self.assertEqual(stats.count, 1)
+
+    def test_request_stats_per_task(self):
+        async def request(queries):
+            stats = start_request()
+            with self.engine.connect() as conn:
+                for _ in range(queries):
+                    conn.execute(text('SELECT 1'))
+                    await asyncio.sleep(0)
+            return stats.count
+
+        async def main():
+            return await asyncio.gather(request(1), request(3))
+
+        self.assertEqual(asyncio.run(main()), [1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
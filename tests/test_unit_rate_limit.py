@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import patch
+
+from redis.exceptions import ConnectionError
+
+from services.rate_limit import RateLimitStore
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def incrby(self, key, amount):
+        self.commands.append(('incrby', key, amount))
+
+    def expire(self, key, seconds):
+        self.commands.append(('expire', key, seconds))
+
+    async def execute(self):
+        if self.redis.down:
+            raise ConnectionError('Redis is down')
+        self.redis.round_trips += 1
+        results = []
+        for command, key, value in self.commands:
+            if command == 'incrby':
+                self.redis.values[key] = self.redis.values.get(key, 0) + value
+                results.append(self.redis.values[key])
+            else:
+                results.append(True)
+        return results
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.round_trips = 0
+        self.down = False
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class TestRateLimitStore(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.store = RateLimitStore(sync_interval=60, sync_batch=1000)
+        self.redis = FakeRedis()
+
+    async def test_local_limit(self):
+        results = [self.store.hit('client', 4, 10) for _ in range(5)]
+
+        self.assertEqual(results[:4], [0, 0, 0, 0])
+        self.assertGreater(results[4], 0)
+        self.assertEqual(self.store.stats()['denied'], 1)
+
+    async def test_refill(self):
+        with patch('services.rate_limit.time.monotonic', return_value=100.0):
+            for _ in range(4):
+                self.store.hit('client', 4, 10)
+            self.assertGreater(self.store.hit('client', 4, 10), 0)
+        with patch('services.rate_limit.time.monotonic', return_value=102.6):
+            self.assertEqual(self.store.hit('client', 4, 10), 0)
+
+    async def test_batched_sync(self):
+        self.store.init(self.redis)
+        for _ in range(3):
+            self.store.hit('client', 10, 10)
+
+        await self.store.sync()
+
+        self.assertEqual(self.redis.round_trips, 1)
+        self.assertEqual(list(self.redis.values.values()), [3])
+        self.assertFalse(self.store.degraded)
+
+    async def test_sync_takes_remote_hits(self):
+        other = RateLimitStore(sync_interval=60, sync_batch=1000)
+        self.store.init(self.redis)
+        other.init(self.redis)
+        for _ in range(3):
+            other.hit('client', 4, 10)
+        await other.sync()
+        self.store.hit('client', 4, 10)
+
+        await self.store.sync()
+
+        self.assertGreater(self.store.hit('client', 4, 10), 0)
+
+    async def test_degraded_when_redis_down(self):
+        self.redis.down = True
+        self.store.init(self.redis)
+        self.store.hit('client', 4, 10)
+
+        await self.store.sync()
+
+        self.assertTrue(self.store.degraded)
+        self.assertEqual(self.store.hit('client', 4, 10), 0)
+        self.redis.down = False
+        await self.store.sync()
+        self.assertFalse(self.store.degraded)
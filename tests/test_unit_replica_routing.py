@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import AsyncMock
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db.routing import ReplicaRouter
+
+
+class TestReplicaRouter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = 100.0
+        engines = [create_async_engine('sqlite+aiosqlite://'), create_async_engine('sqlite+aiosqlite://')]
+        self.router = ReplicaRouter(engines, max_lag=5, check_interval=10, sticky_seconds=5, clock=lambda: self.now)
+
+    async def test_round_robin(self):
+        first = await self.router.get_sessionmaker()
+        second = await self.router.get_sessionmaker()
+        third = await self.router.get_sessionmaker()
+
+        self.assertIs(first, self.router.replicas[0].sessionmaker)
+        self.assertIs(second, self.router.replicas[1].sessionmaker)
+        self.assertIs(third, first)
+
+    async def test_lagging_replica_skipped(self):
+        self.router.replicas[0].measure_lag = AsyncMock(return_value=30.0)
+
+        result = await self.router.get_sessionmaker()
+
+        self.assertIs(result, self.router.replicas[1].sessionmaker)
+
+    async def test_all_replicas_down_falls_back_to_primary(self):
+        for replica in self.router.replicas:
+            replica.measure_lag = AsyncMock(side_effect=ConnectionError())
+
+        result = await self.router.get_sessionmaker()
+
+        self.assertIsNone(result)
+
+    async def test_lag_rechecked_after_interval(self):
+        replica = self.router.replicas[0]
+        replica.measure_lag = AsyncMock(return_value=0.0)
+        await self.router._is_fresh(replica)
+        await self.router._is_fresh(replica)
+        self.assertEqual(replica.measure_lag.await_count, 1)
+
+        self.now += 10
+        await self.router._is_fresh(replica)
+        self.assertEqual(replica.measure_lag.await_count, 2)
+
+    def test_sticky_after_write(self):
+        self.router.mark_write('Bearer token')
+
+        self.assertTrue(self.router.is_sticky('Bearer token'))
+        self.assertFalse(self.router.is_sticky('Bearer other'))
+        self.assertFalse(self.router.is_sticky(None))
+        self.now += 5
+        self.assertFalse(self.router.is_sticky('Bearer token'))
+
+
+if __name__ == '__main__':
+    unittest.main()
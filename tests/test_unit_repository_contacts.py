@@ -1,11 +1,11 @@
 import unittest
 from unittest.mock import MagicMock
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from datetime import datetime
 
-from schemas import ContactModel
+from schemas import ContactModel, ContactBatchUpdate
 from db.models import User, Contact
 from repository.contacts import (
     get_contacts,
@@ -14,37 +14,44 @@ from repository.contacts import (
     create_contact,
     update_contact,
     delete_contact,
+    batch_contacts,
 )
 
 class TestContact(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
         self.user = User(id=1)
 
     async def test_get_contacts(self):
         contacts = [Contact(), Contact(), Contact()]
-        self.session.query().filter().all.return_value = contacts
+        self.session.scalars.return_value = MagicMock(all=MagicMock(return_value=contacts))
         result = await get_contacts(name=None, lastname=None, email=None, user=self.user, db=self.session)
         self.assertEqual(result, contacts)
 
     async def test_get_contact_found(self):
         contact = Contact()
-        self.session.query().filter().first.return_value = contact
+        self.session.scalar.return_value = contact
         result = await get_contact(contact_id=1, user=self.user, db=self.session)
         self.assertEqual(result, contact)
 
     async def test_get_contact_not_found(self):
-        self.session.query().filter().first.return_value = None
+        self.session.scalar.return_value = None
         result = await get_contact(contact_id=1, user=self.user, db=self.session)
         self.assertIsNone(result)
 
     async def test_get_contacts_with_nearest_birthday(self):
         contacts = [Contact(birthday=datetime.now().date())]
-        self.session.query().filter().all.return_value = contacts
+        self.session.scalars.return_value = MagicMock(all=MagicMock(return_value=contacts))
         result = await get_contacts_with_nearest_birthday(user=self.user, db=self.session)
         self.assertEqual(result, contacts)
 
+    def test_contact_birthday_key(self):
+        contact = Contact(birthday=datetime(2000, 12, 31).date())
+        self.assertEqual(contact.birthday_mmdd, 1231)
+        contact.birthday = datetime(2000, 2, 29).date()
+        self.assertEqual(contact.birthday_mmdd, 229)
+
     async def test_create_contact(self):
         body = ContactModel(name='TestName', lastname='TestLastName', email='user@example.com', phone_number='+380666666666', birthday='2020-09-12')
         result = await create_contact(body=body, user=self.user, db=self.session)
@@ -58,27 +65,44 @@ class TestContact(unittest.IsolatedAsyncioTestCase):
     async def test_update_contact_found(self):
         body = ContactModel(name='TestName', lastname='TestLastName', email='user@example.com', phone_number='+380666666666', birthday='2020-09-12')
         contact = Contact()
-        self.session.query().filter().first.return_value = contact
+        self.session.scalar.return_value = contact
         result = await update_contact(contact_id=1, body=body, user=self.user, db=self.session)
         self.assertEqual(result, contact)
 
     async def test_update_contact_not_found(self):
         body = ContactModel(name='TestName', lastname='TestLastName', email='user@example.com', phone_number='+380666666666', birthday='2020-09-12')
-        self.session.query().filter().first.return_value = None
+        self.session.scalar.return_value = None
         result = await update_contact(contact_id=1, body=body, user=self.user, db=self.session)
         self.assertIsNone(result)
 
     async def test_delete_contact_found(self):
         contact = Contact()
-        self.session.query().filter().first.return_value = contact
+        self.session.scalar.return_value = contact
         result = await delete_contact(contact_id=1, user=self.user, db=self.session)
         self.assertEqual(result, contact)
 
     async def test_delete_contact_not_found(self):
-        self.session.query().filter().first.return_value = None
+        self.session.scalar.return_value = None
         result = await delete_contact(contact_id=1, user=self.user, db=self.session)
         self.assertIsNone(result)
 
+    async def test_batch_contacts(self):
+        contacts = [Contact(id=1), Contact(id=2)]
+        self.session.execute.side_effect = [MagicMock(), MagicMock(scalars=MagicMock(return_value=MagicMock(all=MagicMock(return_value=[3]))))]
+        self.session.scalars.return_value = MagicMock(all=MagicMock(return_value=contacts))
+        found, deleted = await batch_contacts(get_ids=[1], updates=[ContactBatchUpdate(id=2, name='name')],
+                                              delete_ids=[3, 4], user=self.user, db=self.session)
+        self.assertEqual(found, {1: contacts[0], 2: contacts[1]})
+        self.assertEqual(deleted, {3})
+        self.assertEqual(self.session.execute.await_args_list[0].args[1], [{'id': 2, 'name': 'name'}])
+        self.session.commit.assert_awaited_once()
+
+    async def test_batch_contacts_empty(self):
+        found, deleted = await batch_contacts(get_ids=[], updates=[], delete_ids=[], user=self.user, db=self.session)
+        self.assertEqual((found, deleted), ({}, set()))
+        self.session.execute.assert_not_called()
+        self.session.scalars.assert_not_called()
+
 
 if __name__ == '__main__':
     unittest.main()
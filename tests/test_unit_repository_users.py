@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import MagicMock, patch
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from libgravatar import Gravatar
 
 from db.models import User
@@ -17,7 +17,7 @@ from repository.users import (
 
 class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
         self.body = UserModel(
             username="username",
             email="email@example.com",
@@ -38,8 +38,8 @@ class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
             self.assertTrue(hasattr(result, 'id'))
 
             self.session.add.assert_called_once_with(result)
-            self.session.commit.assert_called_once()
-            self.session.refresh.assert_called_once_with(result)
+            self.session.commit.assert_awaited_once()
+            self.session.refresh.assert_awaited_once_with(result)
 
     async def test_confirmed_email(self):
         user = User(id=1, confirmed=True)
@@ -48,18 +48,18 @@ class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
 
         self.assertIsNone(result)
         self.assertTrue(user.confirmed)
-        self.session.commit.assert_called_once()
+        self.session.commit.assert_awaited_once()
 
     async def test_get_user_by_email_found(self):
         user = User()
-        self.session.query().filter().first.return_value = user
+        self.session.scalar.return_value = user
 
         result = await get_user_by_email(email="email@example.com", db=self.session)
 
         self.assertEqual(result, user)
 
     async def test_get_user_by_email_not_found(self):
-        self.session.query().filter().first.return_value = None
+        self.session.scalar.return_value = None
 
         result = await get_user_by_email(email="email@example.com", db=self.session)
 
@@ -67,23 +67,23 @@ class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
 
     async def test_update_token_found(self):
         user = User()
-        self.session.query().filter().first.return_value = user
+        self.session.scalar.return_value = user
 
         new_token = "new_token"
         result = await update_token(user=user, token=new_token, db=self.session)
 
         self.assertIsNone(result)
         self.assertEqual(user.refresh_token, new_token)
-        self.session.commit.assert_called_once()
+        self.session.commit.assert_awaited_once()
 
     async def test_update_avatar_found(self):
         user = User()
-        self.session.query().filter().first.return_value = user
+        self.session.scalar.return_value = user
 
         result = await update_avatar(email='user@example.com', url='new_url_address', db=self.session)
 
         self.assertEqual(result, user)
-        self.session.commit.assert_called_once()
+        self.session.commit.assert_awaited_once()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import AsyncMock
+
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError
+
+from services.token_store import RefreshTokenStore
+
+
+class TestRefreshTokenStore(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.store = RefreshTokenStore(ttl=60)
+
+    async def test_rotate(self):
+        jti, family = await self.store.issue('user@example.com')
+
+        new_jti, new_family = await self.store.rotate({'jti': jti, 'fam': family, 'sub': 'user@example.com'})
+
+        self.assertNotEqual(new_jti, jti)
+        self.assertEqual(new_family, family)
+
+    async def test_issue_redis_down(self):
+        self.store.init(AsyncMock(set=AsyncMock(side_effect=ConnectionError('down'))))
+
+        with self.assertRaises(HTTPException) as error:
+            await self.store.issue('user@example.com')
+
+        self.assertEqual(error.exception.status_code, 503)
+        self.assertEqual(error.exception.headers['Retry-After'], '5')
+
+    async def test_rotate_redis_down(self):
+        self.store.init(AsyncMock(get=AsyncMock(side_effect=ConnectionError('down'))))
+
+        with self.assertRaises(HTTPException) as error:
+            await self.store.rotate({'jti': 'jti', 'fam': 'family', 'sub': 'user@example.com'})
+
+        self.assertEqual(error.exception.status_code, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+from redis.exceptions import ConnectionError
+
+from db.models import User
+from services.user_cache import UserCache
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = UserCache(local_ttl=30, maxsize=2, redis_ttl=300)
+        self.user = User(id=1, username='username', email='user@example.com', confirmed=True,
+                         created_at=datetime(2023, 10, 2, 12, 0), avatar='avatar_url', password='hash')
+
+    async def test_local_hit(self):
+        await self.cache.set(self.user)
+
+        result = await self.cache.get('user@example.com')
+
+        self.assertEqual(result.id, 1)
+        self.assertEqual(result.created_at, self.user.created_at)
+        self.assertIsNone(result.password)
+
+    async def test_miss(self):
+        self.assertIsNone(await self.cache.get('user@example.com'))
+
+    async def test_lru_eviction(self):
+        for i in range(3):
+            await self.cache.set(User(id=i, email=f'user{i}@example.com'))
+
+        self.assertIsNone(await self.cache.get('user0@example.com'))
+        self.assertIsNotNone(await self.cache.get('user2@example.com'))
+
+    async def test_redis_hit(self):
+        redis = AsyncMock()
+        redis.get.return_value = json.dumps({'id': 1, 'username': 'username', 'email': 'user@example.com',
+                                             'confirmed': True, 'created_at': '2023-10-02T12:00:00', 'avatar': None})
+        self.cache.init(redis)
+
+        result = await self.cache.get('user@example.com')
+
+        redis.get.assert_awaited_once_with('user:user@example.com')
+        self.assertEqual(result.created_at, datetime(2023, 10, 2, 12, 0))
+
+    async def test_invalidate(self):
+        redis = AsyncMock()
+        redis.get.return_value = None
+        self.cache.init(redis)
+        await self.cache.set(self.user)
+
+        await self.cache.invalidate('user@example.com')
+
+        redis.delete.assert_awaited_once_with('user:user@example.com')
+        self.assertIsNone(await self.cache.get('user@example.com'))
+
+    async def test_redis_down(self):
+        redis = AsyncMock()
+        redis.get.side_effect = ConnectionError()
+        self.cache.init(redis)
+
+        self.assertIsNone(await self.cache.get('user@example.com'))
+
+
+if __name__ == '__main__':
+    unittest.main()